@@ -0,0 +1,132 @@
+"""Shared helpers for the benchmark scripts.
+These are run by Blender rather than imported by the addon, so this folder intentionally has no __init__.py
+(which also stops auto_load from picking it up)."""
+import sys
+import json
+import random
+from math import ceil, sqrt
+from pathlib import Path
+from time import perf_counter
+from types import SimpleNamespace
+
+import bpy
+
+ROOT = Path(__file__).resolve().parents[1]
+
+sys.path.insert(0, str(ROOT / "tools"))
+from addon_loader import load_addon, addon_module  # noqa: E402, F401
+
+
+def script_args() -> list[str]:
+    """Get the arguments passed to the script after the '--' separator"""
+    return sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+
+def iter_node_trees():
+    """Yield every node tree in the file, including the embedded trees of materials, scenes and worlds."""
+    yield from bpy.data.node_groups
+    for collection in (bpy.data.materials, bpy.data.scenes, bpy.data.worlds, bpy.data.lights):
+        for data in collection:
+            if getattr(data, "node_tree", None):
+                yield data.node_tree
+
+
+def time_call(func, *args, repeat=5, **kwargs) -> tuple[float, object]:
+    """Call a function several times and return the fastest time and the last result"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, perf_counter() - start)
+    return best, result
+
+
+def write_results(results: dict, path: str = ""):
+    """Print the results as json, and also write them to a file if a path is given"""
+    text = json.dumps(results, indent=2)
+    if path:
+        Path(path).write_text(text)
+    print(text)
+
+
+def make_synthetic_tree(name: str, node_count: int, reroute_ratio=0.0, seed=0):
+    """Create a geometry node group with the given number of nodes laid out in a grid.
+    A proportion of the nodes can be reroutes, to emulate trees with long reroute chains."""
+    rng = random.Random(seed)
+    tree = bpy.data.node_groups.new(name, "GeometryNodeTree")
+    columns = ceil(sqrt(node_count))
+    for i in range(node_count):
+        is_reroute = rng.random() < reroute_ratio
+        node = tree.nodes.new("NodeReroute" if is_reroute else "GeometryNodeSetPosition")
+        node.location = ((i % columns) * 250, -(i // columns) * 200)
+    return tree
+
+
+def measure(func, setup=None, repeat=5) -> float:
+    """Get the fastest time of several calls to func. setup is called before each one, and isn't timed."""
+    best = float("inf")
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = perf_counter()
+        func()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+class FakeView2D():
+    """Stands in for View2D in background mode, where there are no editors. Region and view space are the same."""
+
+    def view_to_region(self, x, y, clip=True):
+        return x, y
+
+    def region_to_view(self, x, y):
+        return x, y
+
+
+class FakeArea():
+    """Just enough of a node editor area for view_to_region and region_to_view"""
+
+    def __init__(self):
+        # The window region of a node editor is the fourth one
+        self.regions = [None, None, None, SimpleNamespace(view2d=FakeView2D())]
+
+
+def make_framed_tree(name: str, node_count: int, frame_count: int, depth=1, reroute_ratio=0.0, seed=0):
+    """Create a synthetic tree where the nodes are split evenly between poly frames.
+    If depth is more than 1, the frames are nested as a binary tree (frame i is a subframe of frame (i - 1) // 2)
+    until that depth is reached.
+    The ID properties are written directly, as going through the normal api to build large trees takes far too long.
+    Note that node dimensions are only calculated when nodes are drawn, so they are 0 in background mode."""
+    write_array = addon_module("poly_frames.pf_storage").write_array
+    tree = make_synthetic_tree(name, node_count, reroute_ratio=reroute_ratio, seed=seed)
+    nodes = list(tree.nodes)
+    for i, node in enumerate(nodes):
+        node.poly_frames["_uid"] = i
+
+    pf = tree.poly_frames
+    chunk = max(1, len(nodes) // frame_count)
+    for i in range(frame_count):
+        frame = pf.frames.add()
+        frame["_frame_id"] = i
+        frame["_name"] = str(i)
+        write_array(frame, "_node_uids", range(i * chunk, min((i + 1) * chunk, len(nodes))), "<i4")
+        frame.label = f"Frame {i}"
+
+    depths = [0] * frame_count
+    subframes = {}
+    for i in range(1, frame_count):
+        parent = (i - 1) // 2
+        if depths[parent] + 1 < depth:
+            depths[i] = depths[parent] + 1
+            subframes.setdefault(parent, []).append(i)
+    for parent, children in subframes.items():
+        write_array(pf.frames[parent], "_subframes", children, "<i4")
+
+    geometry = addon_module("poly_frames.pf_functions").NodeGeometry(tree)
+    for frame in pf.frames:
+        frame.update_fingerprint(geometry)
+    pf.frame_order = list(range(frame_count))
+    pf.prev_frame_number = frame_count
+    return tree
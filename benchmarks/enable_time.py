@@ -0,0 +1,101 @@
+"""Measure how long it takes to enable the addon, with and without the auto_load manifest.
+
+    python benchmarks/enable_time.py [--blender /path/to/blender] [--runs 5] [--output results.json]
+
+Each run is a new background Blender process, so that nothing is already imported. There are three modes:
+    off: AUTO_LOAD_MANIFEST=0, so every module is imported and the classes are found by reflection
+    cold: the manifest is deleted first, so it is worked out from scratch and then written
+    warm: the manifest from the previous run is used
+The median of the time taken by addon_utils.enable() and by auto_load.init() is reported for each mode."""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+from time import perf_counter
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+ROOT = Path(__file__).resolve().parents[1]
+MANIFEST_PATH = ROOT / "shared" / "__pycache__" / "auto_load_manifest.json"
+RESULT_PREFIX = "POLY_FRAMES_ENABLE:"
+MODES = ["off", "cold", "warm"]
+
+
+# Run inside Blender
+#################################################
+
+
+def blender_main():
+    import addon_utils
+
+    sys.path.insert(0, str(ROOT.parent))
+    start = perf_counter()
+    addon_utils.enable(ROOT.name, default_set=True)
+    enable_time = perf_counter() - start
+
+    auto_load = sys.modules[ROOT.name + ".shared.auto_load"]
+    result = {
+        "enable": enable_time,
+        "init": auto_load.stats["init"],
+        "manifest": auto_load.stats["manifest"],
+        "modules": sum(name.startswith(ROOT.name + ".") for name in sys.modules),
+    }
+    print(RESULT_PREFIX + json.dumps(result))
+
+
+# Run outside of Blender
+#################################################
+
+
+def enable_once(blender: str, mode: str) -> dict:
+    env = dict(os.environ, AUTO_LOAD_MANIFEST="0" if mode == "off" else "1")
+    if mode == "cold":
+        MANIFEST_PATH.unlink(missing_ok=True)
+    command = [blender, "--background", "--factory-startup", "--python", __file__]
+    process = subprocess.run(command, capture_output=True, text=True, env=env)
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"Enabling the addon failed:\n{process.stderr[-2000:] or process.stdout[-2000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="The blender executable")
+    parser.add_argument("--runs", type=int, default=5, help="How many times to enable the addon in each mode")
+    parser.add_argument("--output", default="", help="Where to write the json results")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in MODES:
+        runs = []
+        for _ in range(args.runs):
+            # Warm runs need the manifest from a previous run
+            if mode == "warm" and not MANIFEST_PATH.exists():
+                enable_once(args.blender, "cold")
+            runs.append(enable_once(args.blender, mode))
+        results[mode] = {
+            "enable_ms": statistics.median(r["enable"] for r in runs) * 1000,
+            "init_ms": statistics.median(r["init"] for r in runs) * 1000,
+            "manifest": sorted({r["manifest"] for r in runs}),
+            "modules": runs[-1]["modules"],
+        }
+        result = results[mode]
+        print(f"{mode:<5} enable {result['enable_ms']:>8.1f} ms, auto_load.init {result['init_ms']:>8.1f} ms, "
+              f"{result['modules']} modules imported")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    if bpy is not None:
+        blender_main()
+    else:
+        main()
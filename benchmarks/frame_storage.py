@@ -0,0 +1,105 @@
+"""Compare the size and load time of files that store the frame data as packed bytes and as ID property lists.
+
+    blender --background --factory-startup --python benchmarks/frame_storage.py -- \
+        [--frames 500] [--nodes 5000] [--repeat 3] [--output results.json]
+
+For each format, a tree is built and baked and the file is saved. The file is then reopened, and all of the frame
+data (shapes, node uids and subframes) is read back.
+The time taken to migrate the file saved in the old format to the packed one is also measured.
+"""
+import os
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import bpy
+
+sys.path.insert(0, str(Path(__file__).parent))
+from bench_utils import addon_module, load_addon, make_framed_tree, script_args, write_results  # noqa: E402
+
+TREE_NAME = "frame_storage"
+
+
+def read_all(node_tree) -> float:
+    """Read every array stored by every frame, without using any cached values"""
+    pf_storage = addon_module("poly_frames.pf_storage")
+    addon_module("poly_frames.pf_settings").clear_py_object_caches()
+    start = perf_counter()
+    for frame in node_tree.poly_frames.frames:
+        frame.shape.verts
+        frame.shape_region.verts
+        for key, (dtype, width) in pf_storage.PACKED_KEYS.items():
+            pf_storage.read_array(frame, key, dtype, width)
+    return perf_counter() - start
+
+
+def bench_format(packed: bool, frame_count: int, node_count: int, repeat: int, path: Path) -> dict:
+    pf_storage = addon_module("poly_frames.pf_storage")
+    pf_rebake = addon_module("poly_frames.pf_rebake")
+    pf_storage.use_packed = packed
+
+    bpy.ops.wm.read_homefile(use_empty=True)
+    tree = make_framed_tree(TREE_NAME, node_count, frame_count, depth=2)
+    pf_rebake.rebake_tree(tree)
+    for frame in tree.poly_frames.frames:
+        # This is normally set every time the frame is drawn
+        frame.shape_region = frame.shape
+
+    start = perf_counter()
+    bpy.ops.wm.save_as_mainfile(filepath=str(path), compress=False)
+    save_time = perf_counter() - start
+
+    open_times = []
+    read_times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        bpy.ops.wm.open_mainfile(filepath=str(path), load_ui=False)
+        open_times.append(perf_counter() - start)
+        read_times.append(read_all(bpy.data.node_groups[TREE_NAME]))
+
+    return {
+        "file_size": path.stat().st_size,
+        "save": save_time,
+        "open": min(open_times),
+        "read_all": min(read_times),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="frame_storage.py")
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--nodes", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="", help="Where to write the results json")
+    args = parser.parse_args(script_args())
+
+    load_addon()
+    pf_storage = addon_module("poly_frames.pf_storage")
+    pf_rebake = addon_module("poly_frames.pf_rebake")
+    folder = Path(tempfile.mkdtemp())
+    results = {}
+    try:
+        for name, packed in (("lists", False), ("packed", True)):
+            print(f"Benchmarking {name} storage")
+            results[name] = bench_format(packed, args.frames, args.nodes, args.repeat, folder / f"{name}.blend")
+
+        # Open the old format without converting it, and then time converting it
+        pf_storage.use_packed = False
+        bpy.ops.wm.open_mainfile(filepath=str(folder / "lists.blend"), load_ui=False)
+        pf_storage.use_packed = True
+        start = perf_counter()
+        results["migrate"] = {"frames": pf_rebake.migrate_all(), "time": perf_counter() - start}
+    finally:
+        pf_storage.use_packed = True
+        for file in folder.iterdir():
+            os.remove(file)
+        folder.rmdir()
+
+    results["meta"] = {"blender": bpy.app.version_string, "frames": args.frames, "nodes": args.nodes}
+    results["size_ratio"] = results["packed"]["file_size"] / results["lists"]["file_size"]
+    write_results(results, args.output)
+
+
+main()
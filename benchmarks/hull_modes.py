@@ -0,0 +1,57 @@
+"""Compare the padded point cloud hull against the offset (minkowski) hull on large synthetic trees.
+
+    blender --python benchmarks/hull_modes.py -- [output.json]
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import bpy
+
+sys.path.insert(0, str(Path(__file__).parent))
+from bench_utils import addon_module, make_synthetic_tree, script_args, time_call, write_results  # noqa: E402
+
+NODE_COUNTS = (1000, 2000, 5000)
+FRAME_SIZE = 50
+MODES = ("POINTS", "MINKOWSKI")
+
+
+def bench_tree(pf_shapes, tree) -> dict:
+    nodes = list(tree.nodes)
+    # The shape functions only need the subframes of a frame, so there's no need to create real poly frames.
+    frame = SimpleNamespace(subframes=set())
+    groups = [set(nodes[i:i + FRAME_SIZE]) for i in range(0, len(nodes), FRAME_SIZE)]
+    results = {}
+    for mode in MODES:
+        gather = pf_shapes.get_core_points if mode == "MINKOWSKI" else pf_shapes.get_hull_points
+        whole_time, (shape, _) = time_call(pf_shapes.build_frame_shape, frame, set(nodes), mode=mode)
+        split_time = 0.0
+        split_verts = 0
+        for group in groups:
+            time, (group_shape, _) = time_call(pf_shapes.build_frame_shape, frame, group, mode=mode)
+            split_time += time
+            split_verts += len(group_shape.verts)
+        results[mode] = {
+            "input_points": len(gather(frame, set(nodes))),
+            "whole_tree_time": whole_time,
+            "whole_tree_verts": len(shape.verts),
+            f"frames_of_{FRAME_SIZE}_time": split_time,
+            f"frames_of_{FRAME_SIZE}_verts": split_verts,
+        }
+    return results
+
+
+def main():
+    pf_shapes = addon_module("poly_frames.pf_shapes")
+    results = {}
+    for count in NODE_COUNTS:
+        for reroute_ratio in (0.0, 0.5):
+            tree = make_synthetic_tree("hull_modes_bench", count, reroute_ratio=reroute_ratio)
+            results[f"{count}_nodes_{int(reroute_ratio * 100)}%_reroutes"] = bench_tree(pf_shapes, tree)
+            bpy.data.node_groups.remove(tree)
+
+    args = script_args()
+    write_results(results, args[0] if args else "")
+
+
+main()
@@ -0,0 +1,46 @@
+"""Report how many vertices hull simplification removes from the poly frames in a real file.
+Run from Blender with the file open:
+
+    blender my_file.blend --python benchmarks/hull_simplify.py -- [output.json]
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from bench_utils import addon_module, iter_node_trees, script_args, time_call, write_results  # noqa: E402
+
+TOLERANCES = (0.5, 1, 2, 4, 8)
+
+
+def main():
+    pf_shapes = addon_module("poly_frames.pf_shapes")
+    results = {"tolerances": TOLERANCES, "trees": {}}
+
+    for tree in iter_node_trees():
+        frames = list(tree.poly_frames.frames)
+        if not frames:
+            continue
+        totals = {"frames": len(frames), "raw_verts": 0, "raw_time": 0.0}
+        for tolerance in TOLERANCES:
+            totals[f"verts_{tolerance}"] = 0
+            totals[f"time_{tolerance}"] = 0.0
+
+        for frame in frames:
+            points = pf_shapes.get_hull_points(frame, frame.nodes)
+            if len(points) < 3:
+                continue
+            time, shape = time_call(pf_shapes.hull_from_points, points)
+            totals["raw_verts"] += len(shape.verts)
+            totals["raw_time"] += time
+            for tolerance in TOLERANCES:
+                time, shape = time_call(pf_shapes.hull_from_points, points, tolerance=tolerance)
+                totals[f"verts_{tolerance}"] += len(shape.verts)
+                totals[f"time_{tolerance}"] += time
+
+        results["trees"][tree.name] = totals
+
+    args = script_args()
+    write_results(results, args[0] if args else "")
+
+
+main()
@@ -0,0 +1,200 @@
+"""Time the main operations of poly frames on large synthetic node trees.
+
+Run the benchmarks (in Blender):
+
+    blender --background --factory-startup --python benchmarks/large_trees.py -- \
+        [--output results.json] [--scenarios small,nested] [--repeat 5] [--compare baseline.json] [--threshold 0.15]
+
+Compare two results files (in any Python 3 interpreter):
+
+    python benchmarks/large_trees.py --compare baseline.json results.json [--threshold 0.15]
+
+When comparing, the exit code is 1 if any metric is slower than the baseline by more than the threshold.
+Some of the larger nested scenarios take a long time, as looking up the parent of a frame is quadratic in the number
+of frames. That's what they are there to show.
+"""
+import io
+import sys
+import json
+import random
+import argparse
+from pathlib import Path
+from functools import partial
+from contextlib import redirect_stdout
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+# (node count, frame count, nesting depth, proportion of reroutes)
+SCENARIOS = {
+    "small": (1000, 10, 1, 0.0),
+    "nested": (2000, 100, 8, 0.0),
+    "reroutes": (5000, 100, 2, 0.6),
+    "wide": (10000, 1000, 1, 0.0),
+    "huge": (20000, 500, 3, 0.2),
+}
+# Times faster than this (in seconds) are too noisy to count as regressions
+NOISE_FLOOR = 0.0005
+HIT_TEST_POINTS = 50
+SAMPLE_FRAMES = 10
+NEW_FRAMES = 5
+NEW_FRAME_NODES = 10
+
+
+# Run inside Blender
+#################################################
+
+
+def bench_scenario(name: str, node_count: int, frame_count: int, depth: int, reroute_ratio: float, repeat: int):
+    from bench_utils import FakeArea, addon_module, make_framed_tree, measure
+    from mathutils import Vector as V
+
+    draw_handlers = addon_module("poly_frames.draw_handlers")
+    pf_scheduler = addon_module("poly_frames.pf_scheduler")
+    pf_rebake = addon_module("poly_frames.pf_rebake")
+    NodeGeometry = addon_module("poly_frames.pf_functions").NodeGeometry
+    get_prefs = addon_module("shared.functions").get_prefs
+
+    tree = make_framed_tree(f"bench_{name}", node_count, frame_count, depth=depth, reroute_ratio=reroute_ratio)
+    pf = tree.poly_frames
+    frames = list(pf.frames)
+    rng = random.Random(0)
+    results = {}
+
+    # Rebuild every frame from scratch
+    rebuild = partial(
+        draw_handlers.update_frame,
+        view_rect=pf_rebake.DEFAULT_VIEW,
+        view_scale=pf_rebake.DEFAULT_VIEW_SCALE,
+        prefs=get_prefs(bpy.context),
+    )
+
+    def tag_all():
+        for frame in frames:
+            frame["_tag_shape_update"] = True
+
+    results["rebuild_all"] = measure(lambda: pf_scheduler.RebuildScheduler().run(frames, rebuild), tag_all, repeat)
+
+    # Check every frame for changes when nothing has changed, which is the worst case
+    def detect_changes():
+        geometry = NodeGeometry(tree)
+        for frame in frames:
+            draw_handlers.check_frame_changed(frame, geometry)
+
+    results["change_detection"] = measure(detect_changes, repeat=repeat)
+
+    # Hit tests, half at the centers of frames and half at random
+    area = FakeArea()
+    xs = [n.location.x for n in tree.nodes]
+    ys = [n.location.y for n in tree.nodes]
+    points = [V(f.center) for f in rng.sample(frames, min(len(frames), HIT_TEST_POINTS // 2))]
+    while len(points) < HIT_TEST_POINTS:
+        points.append(V((rng.uniform(min(xs), max(xs)), rng.uniform(min(ys), max(ys)))))
+
+    results["point_in_frame"] = measure(lambda: [pf.point_in_frame(area, p) for p in points], repeat=repeat)
+    results["point_on_frame_edge"] = measure(lambda: [pf.point_on_frame_edge(area, p) for p in points], repeat=repeat)
+
+    # Move some frames to the right and back again
+    sample = rng.sample(frames, min(len(frames), SAMPLE_FRAMES))
+
+    def move():
+        for frame in sample:
+            frame.move(V((10, 0)))
+        for frame in sample:
+            frame.move(V((-10, 0)))
+
+    results["move"] = measure(move, repeat=repeat)
+
+    # Create new frames from nodes that aren't in one yet, and then remove them again
+    new_nodes = []
+    for i in range(NEW_FRAMES * NEW_FRAME_NODES):
+        node = tree.nodes.new("GeometryNodeSetPosition")
+        node.location = (i * 250, 1000)
+        new_nodes.append(node)
+    groups = [set(new_nodes[i:i + NEW_FRAME_NODES]) for i in range(0, len(new_nodes), NEW_FRAME_NODES)]
+
+    def create_frames():
+        # add_frame prints debugging info, which would flood the output
+        with redirect_stdout(io.StringIO()):
+            for group in groups:
+                pf.add_frame(group)
+
+    def remove_new_frames():
+        if len(pf.frames) > frame_count:
+            pf.remove_frames(set(list(pf.frames)[frame_count:]))
+
+    results["create_frame"] = measure(create_frames, remove_new_frames, repeat) / NEW_FRAMES
+    remove_new_frames()
+
+    bpy.data.node_groups.remove(tree)
+    return results
+
+
+def run(args) -> dict:
+    from bench_utils import load_addon
+
+    load_addon()
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    results = {}
+    for name in names:
+        node_count, frame_count, depth, reroute_ratio = SCENARIOS[name]
+        print(f"Running {name}: {node_count} nodes, {frame_count} frames, depth {depth}, {reroute_ratio:.0%} reroutes")
+        results[name] = bench_scenario(name, node_count, frame_count, depth, reroute_ratio, args.repeat)
+    meta = {"blender": bpy.app.version_string, "repeat": args.repeat, "scenarios": {n: SCENARIOS[n] for n in names}}
+    return {"meta": meta, "results": results}
+
+
+# Comparison
+#################################################
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Print how each metric has changed, and return the names of the ones that have regressed past the threshold"""
+    regressions = []
+    for scenario, metrics in current["results"].items():
+        base_metrics = baseline["results"].get(scenario, {})
+        for metric, time in metrics.items():
+            if metric not in base_metrics:
+                continue
+            base = base_metrics[metric]
+            change = (time - base) / base if base else 0.0
+            regressed = change > threshold and time - base > NOISE_FLOOR
+            name = f"{scenario}.{metric}"
+            flag = "  REGRESSED" if regressed else ""
+            print(f"{name:<40} {base * 1000:>10.3f} ms {time * 1000:>10.3f} ms {change:>+8.1%}{flag}")
+            if regressed:
+                regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("results", nargs="?", help="The results to compare against the baseline, outside of Blender")
+    parser.add_argument("--output", default="", help="Where to write the results json")
+    parser.add_argument("--scenarios", default="", help=f"Comma separated names from {', '.join(SCENARIOS)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--compare", default="", help="A baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="The allowed slowdown, as a proportion")
+
+    if bpy:
+        sys.path.insert(0, str(Path(__file__).parent))
+        from bench_utils import script_args, write_results
+        args = parser.parse_args(script_args())
+        current = run(args)
+        write_results(current, args.output)
+    else:
+        args = parser.parse_args()
+        if not args.compare or not args.results:
+            parser.error("Outside of Blender, both --compare and a results file are needed")
+        current = json.loads(Path(args.results).read_text())
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if regressions := compare(baseline, current, args.threshold):
+            print(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+main()
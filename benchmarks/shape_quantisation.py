@@ -0,0 +1,148 @@
+"""Check the error bound of quantised shape storage, and compare its size and speed with float32 storage.
+Quantisation is off by default, so it's turned on while this runs.
+
+    python benchmarks/shape_quantisation.py [--shapes 500] [--verts 64] [--repeat 5] [--output results.json]
+
+This only needs numpy, so it runs in any Python 3 interpreter (using the stand-ins in tools/standin to import the
+addon's modules), as well as inside Blender:
+
+    blender --background --factory-startup --python benchmarks/shape_quantisation.py -- [args]
+
+The exit code is 1 if any quantised point is further from the original than half of the quantisation step,
+or if the step is larger than pf_storage.MAX_STEP.
+"""
+import sys
+import json
+import argparse
+from math import tau
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+# Positions and sizes in node editor units. The last size is too large to quantise, and falls back to floats.
+POSITIONS = [0, 1000, -25000, 100000]
+SIZES = [1, 50, 500, 4000, 8000, 20000]
+
+
+def load_storage():
+    if bpy:
+        sys.path.insert(0, str(Path(__file__).parent))
+        from bench_utils import addon_module
+        return addon_module("poly_frames.pf_storage")
+    sys.path.insert(0, str(Path(__file__).parents[1] / "tools"))
+    import standin
+    return standin.load("poly_frames.pf_storage")
+
+
+def make_shapes(count: int, verts: int, seed=0) -> list[np.ndarray]:
+    """Make noisy circles of different sizes in different places"""
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, tau, verts, endpoint=False)
+    shapes = []
+    for i in range(count):
+        size = SIZES[i % len(SIZES)]
+        radius = size / 2 * rng.uniform(0.8, 1, verts)
+        position = rng.choice(POSITIONS, 2) + rng.uniform(-100, 100, 2)
+        points = np.stack((np.cos(angles) * radius, np.sin(angles) * radius), axis=1) + position
+        shapes.append(points.astype(np.float32))
+    return shapes
+
+
+def check_error(pf_storage, shapes) -> dict:
+    quantised = 0
+    max_error = 0.0
+    max_step = 0.0
+    failures = []
+    for i, points in enumerate(shapes):
+        data = pf_storage.pack_points(points)
+        result = pf_storage.unpack(data)
+        error = float(np.abs(result - points).max())
+        if data[3] != pf_storage.QUANTISED:
+            # Stored as floats, so it should be exact
+            if error:
+                failures.append(f"Shape {i} was stored as floats, but changed by {error}")
+            continue
+
+        quantised += 1
+        step = pf_storage.QUANTISED_HEADER.unpack_from(data, pf_storage.HEADER.size)[2]
+        # Allow for the rounding of float32 coordinates
+        bound = step / 2 + float(np.abs(points).max()) * np.finfo(np.float32).eps * 2
+        max_error = max(max_error, error)
+        max_step = max(max_step, step)
+        if error > bound:
+            failures.append(f"Shape {i} has an error of {error}, which is more than the bound of {bound}")
+        if step > pf_storage.MAX_STEP:
+            failures.append(f"Shape {i} has a step of {step}, which is more than {pf_storage.MAX_STEP}")
+
+    return {
+        "shapes": len(shapes),
+        "quantised": quantised,
+        "max_error": max_error,
+        "max_step": max_step,
+        "failures": failures,
+    }
+
+
+def measure_mode(pf_storage, shapes, quantise: bool, repeat: int) -> dict:
+    pf_storage.quantise_shapes = quantise
+    points = sum(len(s) for s in shapes)
+    pack_time = unpack_time = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        packed = [pf_storage.pack_points(s) for s in shapes]
+        pack_time = min(pack_time, perf_counter() - start)
+        start = perf_counter()
+        for data in packed:
+            pf_storage.unpack(data)
+        unpack_time = min(unpack_time, perf_counter() - start)
+
+    return {
+        "bytes": sum(len(data) for data in packed),
+        "bytes_per_point": sum(len(data) for data in packed) / points,
+        "pack_points_per_s": points / pack_time,
+        "unpack_points_per_s": points / unpack_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shapes", type=int, default=500)
+    parser.add_argument("--verts", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="")
+    if bpy:
+        args = parser.parse_args(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
+    else:
+        args = parser.parse_args()
+
+    pf_storage = load_storage()
+    shapes = make_shapes(args.shapes, args.verts)
+    quantise_shapes = pf_storage.quantise_shapes
+    try:
+        pf_storage.quantise_shapes = True
+        # Only compare the shapes that can be quantised, so that the comparison is fair
+        small_shapes = [s for s in shapes if pf_storage.pack_points(s)[3] == pf_storage.QUANTISED]
+        results = {
+            "error": check_error(pf_storage, shapes),
+            "float32": measure_mode(pf_storage, small_shapes, False, args.repeat),
+            "int16": measure_mode(pf_storage, small_shapes, True, args.repeat),
+        }
+    finally:
+        pf_storage.quantise_shapes = quantise_shapes
+    results["size_ratio"] = results["int16"]["bytes"] / results["float32"]["bytes"]
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
+    if results["error"]["failures"]:
+        sys.exit(1)
+
+
+main()
@@ -0,0 +1,132 @@
+"""The work that the draw callback does that doesn't depend on the view, shared between node editors.
+
+draw_callback_px runs once for every node editor area, so when two or three editors show the same tree, they would
+all check the same frames for changes and find the bounds of the same shapes. Instead, the first area to draw a tree
+during a tick of the event loop starts an epoch for it, and the other areas reuse its results, so that each area
+only does its own view transform, culling and drawing.
+The epochs are cleared by a timer with no interval, which runs after all of the areas have been drawn."""
+import bpy
+from typing import Optional
+from bpy.types import NodeTree
+from bpy.app.handlers import persistent
+from .pf_functions import NodeGeometry
+from .pf_settings import FrameItem
+
+
+class TreeEpoch():
+    """The view independent state of one tree during one tick"""
+
+    __slots__ = ["frames", "check_changes", "geometry", "checked", "bounds"]
+
+    def __init__(self, frames: list[FrameItem], check_changes: bool):
+        self.frames = frames
+        # Whether the frames need to be checked for changes during this tick
+        self.check_changes = check_changes
+        self.geometry: Optional[NodeGeometry] = None
+        # frame id: whether the frame should be removed
+        self.checked: dict[int, bool] = {}
+        # frame id: (shape, (min x, min y, max x, max y))
+        self.bounds: dict[int, tuple] = {}
+
+    def get_bounds(self, frame: FrameItem) -> Optional[tuple[float, float, float, float]]:
+        """Get the bounding box of the shape of a frame in view space, or None if it doesn't have a shape.
+        If the frame is rebuilt by one area, its shape is a new object, so the bounds are found again."""
+        shape = frame.shape
+        cached = self.bounds.get(frame.frame_id)
+        if cached and cached[0] is shape:
+            return cached[1]
+
+        verts = shape.verts
+        if verts:
+            xs = [v.x for v in verts]
+            ys = [v.y for v in verts]
+            bounds = (min(xs), min(ys), max(xs), max(ys))
+        else:
+            bounds = None
+        self.bounds[frame.frame_id] = (shape, bounds)
+        return bounds
+
+
+class EpochCache():
+    """Holds the epoch of each tree that has been drawn during the current tick"""
+
+    __slots__ = ["trees", "timer_registered", "started", "reused"]
+
+    def __init__(self):
+        # tree pointer: epoch
+        self.trees: dict[int, TreeEpoch] = {}
+        self.timer_registered = False
+        self.started = 0
+        self.reused = 0
+
+    def get(self, node_tree: NodeTree) -> Optional[TreeEpoch]:
+        epoch = self.trees.get(node_tree.as_pointer())
+        if epoch:
+            self.reused += 1
+        return epoch
+
+    def start(self, node_tree: NodeTree, frames: list[FrameItem], check_changes: bool) -> TreeEpoch:
+        epoch = self.trees[node_tree.as_pointer()] = TreeEpoch(frames, check_changes)
+        self.started += 1
+        if not self.timer_registered:
+            bpy.app.timers.register(end_epochs, first_interval=0)
+            self.timer_registered = True
+        return epoch
+
+    def discard(self, node_tree: NodeTree):
+        """Forget the epoch of a tree, e.g. because its frames have been removed or reordered,
+        so that the next area to draw it starts again"""
+        self.trees.pop(node_tree.as_pointer(), None)
+
+    def clear(self):
+        self.trees.clear()
+
+    def stats(self) -> dict:
+        total = self.started + self.reused
+        return {
+            "started": self.started,
+            "reused": self.reused,
+            "hit_rate": self.reused / total if total else 0.0,
+        }
+
+    def reset(self):
+        self.clear()
+        self.started = self.reused = 0
+
+
+epochs = EpochCache()
+
+
+def end_epochs():
+    # Timers are identified by the function object, so this can't be a bound method.
+    epochs.clear()
+    epochs.timer_registered = False
+    return None
+
+
+@persistent
+def clear_epochs_handler(*args):
+    # The epochs hold references to frames, which aren't valid after undo or loading a new file.
+    epochs.clear()
+
+
+epoch_handlers = [
+    bpy.app.handlers.load_pre,
+    bpy.app.handlers.undo_pre,
+    bpy.app.handlers.redo_pre,
+]
+
+
+def register():
+    for handlers in epoch_handlers:
+        handlers.append(clear_epochs_handler)
+
+
+def unregister():
+    for handlers in epoch_handlers:
+        if clear_epochs_handler in handlers:
+            handlers.remove(clear_epochs_handler)
+    if bpy.app.timers.is_registered(end_epochs):
+        bpy.app.timers.unregister(end_epochs)
+    epochs.reset()
+    epochs.timer_registered = False
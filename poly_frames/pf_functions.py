@@ -1,5 +1,7 @@
-from bpy.types import Node
+import numpy as np
+from bpy.types import Node, NodeTree
 from mathutils import Vector as V
+from .pf_storage import fingerprint
 from ..shared.helpers import Rectangle, dpifac
 
 
@@ -21,4 +23,38 @@ def point_on_node(p: V, nodes: list[Node]) -> Node:
         node_rect = Rectangle(loc, V((loc.x + dims.x, loc.y - dims.y)))
         if node_rect.isinside(p):
             return node
-    return None
\ No newline at end of file
+    return None
+
+
+class NodeGeometry():
+    """The locations and dimensions of every node in a tree, read in bulk with foreach_get.
+    This is a snapshot, so it should be made again after nodes have been moved."""
+
+    __slots__ = ["indices", "rows"]
+
+    def __init__(self, node_tree: NodeTree):
+        nodes = node_tree.nodes
+        locations = np.empty(len(nodes) * 2, dtype=np.float32)
+        dimensions = np.empty(len(nodes) * 2, dtype=np.float32)
+        nodes.foreach_get("location", locations)
+        nodes.foreach_get("dimensions", dimensions)
+        # Each row is (x, y, width, height)
+        self.rows = np.concatenate((locations.reshape(-1, 2), dimensions.reshape(-1, 2)), axis=1)
+        # Nodes compare and hash by their pointer, so new python objects for the same nodes can be looked up
+        self.indices: dict[Node, int] = {node: i for i, node in enumerate(nodes)}
+
+    def get_rows(self, nodes) -> np.ndarray:
+        return self.rows[[self.indices[node] for node in nodes]]
+
+    def fingerprint(self, nodes) -> bytes:
+        """Get a hash of the locations and dimensions of some nodes"""
+        return fingerprint(self.get_rows(nodes))
+
+    def changed_nodes(self, previous: "NodeGeometry", nodes) -> list[Node]:
+        """Get the nodes that have been added, moved or resized since a previous snapshot"""
+        changed = []
+        for node in nodes:
+            i = previous.indices.get(node)
+            if i is None or (previous.rows[i] != self.rows[self.indices[node]]).any():
+                changed.append(node)
+        return changed
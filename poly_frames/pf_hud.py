@@ -0,0 +1,93 @@
+"""An optional overlay in the corner of the node editor that shows what the draw callback is doing.
+All of the numbers are collected by HudStats, which doesn't touch the gpu, so it can be used in background mode.
+Only draw_hud needs a region to draw in."""
+import blf
+from time import perf_counter
+from typing import Optional
+from ..shared.instrumentation import LatencyBuffer
+
+
+class HudStats():
+    """Rolling statistics about the recent draw passes.
+    The draw callback only calls record_pass while the HUD is enabled, so it costs nothing when it is off."""
+
+    __slots__ = ["enabled", "draw_times", "frames", "drawn", "culled", "rebuilt", "removed", "passes",
+                 "event_time", "event_latency"]
+
+    def __init__(self, size=120, enabled=False):
+        self.enabled = enabled
+        self.draw_times = LatencyBuffer(size)
+        self.frames = 0
+        self.drawn = 0
+        self.culled = 0
+        self.rebuilt = 0
+        self.removed = 0
+        self.passes = 0
+        # The time that the last event was handled that hasn't been drawn yet
+        self.event_time: Optional[float] = None
+        # The time between an operator handling an event and the end of the redraw after it, in seconds
+        self.event_latency: Optional[float] = None
+
+    def event_handled(self):
+        """Call when an operator finishes handling an event, to measure how long it takes to show up on screen"""
+        if self.event_time is None:
+            self.event_time = perf_counter()
+
+    def record_pass(self, duration: float, frames: int, drawn: int, culled: int, rebuilt: int, removed: int):
+        """Record the results of a draw pass. duration is in seconds."""
+        self.draw_times.append(duration)
+        self.frames = frames
+        self.drawn = drawn
+        self.culled = culled
+        self.rebuilt = rebuilt
+        self.removed = removed
+        self.passes += 1
+        if self.event_time is not None:
+            self.event_latency = perf_counter() - self.event_time
+            self.event_time = None
+
+    def stats(self, caches: Optional[dict] = None) -> dict:
+        """Get a summary of the recent draw passes, with times in milliseconds.
+        `caches` is a dict of cache names to their hit rates (0 - 1)"""
+        times = self.draw_times.recent()
+        return {
+            "passes": self.passes,
+            "draw_ms": sum(times) / len(times) * 1000 if times else 0.0,
+            "max_draw_ms": max(times) * 1000 if times else 0.0,
+            "frames": self.frames,
+            "drawn": self.drawn,
+            "culled": self.culled,
+            "rebuilt": self.rebuilt,
+            "removed": self.removed,
+            "event_latency_ms": self.event_latency * 1000 if self.event_latency is not None else None,
+            "cache_hit_rates": dict(caches or {}),
+        }
+
+    def lines(self, caches: Optional[dict] = None) -> list[str]:
+        """Get the text to show in the HUD"""
+        stats = self.stats(caches)
+        lines = [
+            f"Draw: {stats['draw_ms']:.2f} ms (max {stats['max_draw_ms']:.2f} ms)",
+            f"Frames: {stats['drawn']} drawn, {stats['culled']} culled, {stats['rebuilt']} rebuilt",
+        ]
+        if stats["event_latency_ms"] is not None:
+            lines.append(f"Last event: {stats['event_latency_ms']:.1f} ms")
+        for name, rate in stats["cache_hit_rates"].items():
+            lines.append(f"{name}: {rate * 100:.0f}% hits")
+        return lines
+
+    def reset(self):
+        self.__init__(size=len(self.draw_times.values), enabled=self.enabled)
+
+
+hud = HudStats()
+
+
+def draw_hud(lines: list[str], x=10, y=10, size=14, font_id=0):
+    """Draw the lines of text from the bottom left corner of the region upwards, with the first line on top"""
+    blf.size(font_id, size, 72)
+    blf.color(font_id, 1, 1, 1, .8)
+    line_height = size * 1.4
+    for i, line in enumerate(reversed(lines)):
+        blf.position(font_id, x, y + i * line_height, 0)
+        blf.draw(font_id, line)
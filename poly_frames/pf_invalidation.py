@@ -0,0 +1,155 @@
+"""Keeps track of which node trees might have changed, so that the draw callback only checks whether the nodes in
+frames have moved when something has actually happened, rather than on every redraw.
+
+Changes are noticed by:
+    msgbus: node location, width and parent changes made through the UI. The callback isn't told which node changed,
+        so every tree is checked once.
+    depsgraph_update_post: the node trees that the depsgraph reports as updated, e.g. when nodes are added or removed.
+    undo_post, redo_post, load_post: anything could have changed, so every tree is checked once.
+
+Neither msgbus nor the depsgraph are told about nodes that are moved while the transform operator is running,
+or by python scripts, so trees are also polled:
+    While another modal operator is running in the window, every redraw is checked, like before.
+    Otherwise each tree is checked at least every POLL_INTERVAL seconds.
+Window.modal_operators was only added in Blender 4.2, so on older versions every redraw is still checked.
+
+The checks themselves compare the fingerprints of the frames (see FrameItem.update_fingerprint), so only the frames
+whose nodes have changed are tagged to be rebuilt."""
+import bpy
+from time import perf_counter
+from bpy.types import NodeTree, Window
+from bpy.app.handlers import persistent
+
+POLL_INTERVAL = 1.0
+
+# The node properties that change the shape of a frame
+SUBSCRIBED_PROPS = ("location", "width", "parent")
+
+
+class Invalidation():
+    """Remembers which trees need to be checked, and when each tree was last checked"""
+
+    __slots__ = ["dirty", "last_checked", "checks", "skips", "events"]
+
+    def __init__(self):
+        # Pointers of the trees that have been reported as changed
+        self.dirty: set[int] = set()
+        # tree pointer: perf_counter() time
+        self.last_checked: dict[int, float] = {}
+        self.checks = 0
+        self.skips = 0
+        # source: number of times that a change has been reported by it
+        self.events: dict[str, int] = {}
+
+    def tag_tree(self, node_tree: NodeTree, source=""):
+        self.dirty.add(node_tree.as_pointer())
+        self.events[source] = self.events.get(source, 0) + 1
+
+    def tag_all(self, source=""):
+        """Check every tree the next time it is drawn"""
+        self.last_checked.clear()
+        self.events[source] = self.events.get(source, 0) + 1
+
+    @staticmethod
+    def other_modal_running(window: Window) -> bool:
+        """Whether an operator other than one of ours is running modally, e.g. node.translate_attach.
+        Returns True if this version of Blender can't tell."""
+        if not hasattr(window, "modal_operators"):
+            return True
+        return any("poly_frame" not in op.bl_idname.lower() for op in window.modal_operators)
+
+    def needs_check(self, node_tree: NodeTree, window: Window) -> bool:
+        """Whether the frames in this tree should be checked for changes during this redraw.
+        If so, the tree is marked as checked."""
+        pointer = node_tree.as_pointer()
+        now = perf_counter()
+        if (pointer in self.dirty or now - self.last_checked.get(pointer, -POLL_INTERVAL) >= POLL_INTERVAL
+                or self.other_modal_running(window)):
+            self.dirty.discard(pointer)
+            self.last_checked[pointer] = now
+            self.checks += 1
+            return True
+        self.skips += 1
+        return False
+
+    def stats(self) -> dict:
+        total = self.checks + self.skips
+        return {
+            "checks": self.checks,
+            "skips": self.skips,
+            "skip_rate": self.skips / total if total else 0.0,
+            "events": dict(self.events),
+        }
+
+    def reset(self):
+        self.dirty.clear()
+        self.last_checked.clear()
+        self.checks = self.skips = 0
+        self.events.clear()
+
+
+invalidation = Invalidation()
+
+# msgbus subscriptions are identified by their owner
+msgbus_owner = object()
+
+
+def msgbus_callback():
+    invalidation.tag_all("msgbus")
+
+
+def subscribe():
+    bpy.msgbus.clear_by_owner(msgbus_owner)
+    for prop in SUBSCRIBED_PROPS:
+        bpy.msgbus.subscribe_rna(
+            key=(bpy.types.Node, prop),
+            owner=msgbus_owner,
+            args=(),
+            notify=msgbus_callback,
+        )
+
+
+@persistent
+def depsgraph_update_handler(scene, depsgraph):
+    for update in depsgraph.updates:
+        # The updates are for the evaluated copies, which have different pointers to the ones that are drawn
+        id_data = update.id.original
+        if isinstance(id_data, NodeTree):
+            invalidation.tag_tree(id_data, "depsgraph")
+        # Materials, worlds etc. have embedded node trees
+        elif node_tree := getattr(id_data, "node_tree", None):
+            invalidation.tag_tree(node_tree, "depsgraph")
+
+
+@persistent
+def undo_handler(*args):
+    invalidation.tag_all("undo")
+
+
+@persistent
+def load_handler(*args):
+    # Loading a file removes all msgbus subscriptions, and the old tree pointers could be reused
+    invalidation.reset()
+    subscribe()
+
+
+handlers = [
+    (bpy.app.handlers.depsgraph_update_post, depsgraph_update_handler),
+    (bpy.app.handlers.undo_post, undo_handler),
+    (bpy.app.handlers.redo_post, undo_handler),
+    (bpy.app.handlers.load_post, load_handler),
+]
+
+
+def register():
+    for handler_list, handler in handlers:
+        handler_list.append(handler)
+    subscribe()
+
+
+def unregister():
+    for handler_list, handler in handlers:
+        if handler in handler_list:
+            handler_list.remove(handler)
+    bpy.msgbus.clear_by_owner(msgbus_owner)
+    invalidation.reset()
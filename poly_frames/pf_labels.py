@@ -0,0 +1,215 @@
+import blf
+import numpy as np
+from math import atan2, pi
+from collections import OrderedDict
+
+
+class TextMetricsCache():
+    """A least recently used cache of blf.dimensions, keyed by font id, text and pixel size.
+
+    Above linear_min_size, the font rasteriser scales linearly, so rather than measuring the text again
+    every time the zoom changes, it is measured once at a reference size and the result is scaled.
+    Smaller sizes are affected by hinting, so they are always measured exactly."""
+
+    __slots__ = ["max_size", "linear_min_size", "reference_size", "cache", "hits", "scaled_hits", "misses",
+                 "evictions"]
+
+    def __init__(self, max_size=512, linear_min_size=16, reference_size=100):
+        self.max_size = max_size
+        self.linear_min_size = linear_min_size
+        self.reference_size = reference_size
+        self.cache: OrderedDict[tuple[int, str, float], tuple[float, float]] = OrderedDict()
+        self.hits = 0
+        self.scaled_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def measure(self, font_id: int, text: str, size: float) -> tuple[float, float]:
+        blf.size(font_id, size, 72)
+        return blf.dimensions(font_id, text)
+
+    def get(self, key):
+        dimensions = self.cache.get(key)
+        if dimensions is not None:
+            self.cache.move_to_end(key)
+        return dimensions
+
+    def add(self, key, dimensions):
+        self.cache[key] = dimensions
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+
+    def dimensions(self, font_id: int, text: str, size: float) -> tuple[float, float]:
+        """Get the pixel dimensions of some text, the same as blf.dimensions at the given size.
+        Note that this changes the size of the font if it needs to be measured."""
+        if size >= self.linear_min_size:
+            key = (font_id, text, self.reference_size)
+            if (reference := self.get(key)) is not None:
+                self.scaled_hits += 1
+            else:
+                self.misses += 1
+                reference = self.measure(font_id, text, self.reference_size)
+                self.add(key, reference)
+            fac = size / self.reference_size
+            return reference[0] * fac, reference[1] * fac
+
+        # Small sizes don't scale linearly, so only reuse measurements of (almost) exactly the same size.
+        key = (font_id, text, round(size, 1))
+        if (dimensions := self.get(key)) is not None:
+            self.hits += 1
+            return dimensions
+        self.misses += 1
+        dimensions = self.measure(font_id, text, size)
+        self.add(key, dimensions)
+        return dimensions
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.scaled_hits + self.misses
+        return {
+            "entries": len(self.cache),
+            "hits": self.hits,
+            "scaled_hits": self.scaled_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.scaled_hits) / lookups if lookups else 0.0,
+        }
+
+
+label_metrics = TextMetricsCache()
+
+
+def label_font_size(view_size: float, label_size: int) -> float:
+    """Get the pixel size of a label, which scales with the zoom level of the view.
+    view_size is the length of the diagonal of the view in node space."""
+    return 100000 / view_size * (label_size / 20)
+
+
+# Layout
+#################################################
+
+
+def score_edges_top(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Score each edge by its height, for placing the label on top of the highest edge"""
+    return starts[:, 1] + ends[:, 1]
+
+
+def score_edges_edge(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """The vectorised version of pf_functions.edge_sort.
+    Scores each edge by its length if it points in the correct direction, otherwise 0."""
+    edges = starts - ends
+    lengths = np.hypot(edges[:, 0], edges[:, 1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pointing_left = -edges[:, 0] / lengths > .6
+    return lengths * pointing_left
+
+
+def layout_label(
+    verts: np.ndarray,
+    center,
+    label_type: str,
+    dimensions,
+    label_offset=(0, 0),
+) -> tuple[tuple[float, float], float]:
+    """Get the location and rotation of a label in node space.
+
+    Args:
+        `verts` (np.ndarray): The outline of the frame as an (n, 2) array.
+        `center`: The center of the frame.
+        `label_type` (str): One of "TOP", "EDGE" or "CENTER".
+        `dimensions`: The dimensions of the label text in node space.
+        `label_offset`: The user defined offset of the label.
+    """
+    # The edges go from each vertex to the previous one, the same as Polygon.as_lines.
+    starts = verts
+    ends = np.roll(verts, 1, axis=0)
+    offset = np.array(label_offset, dtype=np.float64)
+    loc = np.zeros(2)
+    rot = 0.0
+
+    if label_type in {"TOP", "EDGE"} and len(verts):
+        # Draw the label on the highest edge, or parallel to the longest edge that points up.
+        scores = score_edges_top(starts, ends) if label_type == "TOP" else score_edges_edge(starts, ends)
+        i = int(np.argmax(scores))
+        edge = starts[i] - ends[i]
+        length = np.hypot(*edge)
+        fac = .5 + (dimensions[0] / (length + .00000001)) / 2
+        loc = ends[i] + (starts[i] - ends[i]) * fac
+
+        if label_type == "EDGE" and length:
+            # Convert the normal direction to radians that can be used for text rotation
+            normal = edge / length
+            rot = atan2(normal[1], normal[0]) + pi
+            # Get the tangent by rotating the normal vector by 90 degrees
+            tangent = np.array((normal[1], -normal[0]))
+            # Add the UI x and y offsets along the normal and tangent directions
+            loc = loc + ((tangent * offset[1]) + (normal * offset[0])) * 10
+
+    # Draw the label in the center of the frame
+    elif label_type == "CENTER":
+        loc = np.array((center[0] - dimensions[0] / 2, center[1] - dimensions[1] / 2))
+
+    # If the label isn't rotated, add the user defined offset now.
+    if rot == 0:
+        loc = loc + offset * 10
+    return (float(loc[0]), float(loc[1])), rot
+
+
+class LabelLayoutCache():
+    """A least recently used cache of label layouts.
+    Layout doesn't depend on where a frame is, so the shape is stored relative to its first vertex.
+    That means that frames that are only being dragged around reuse their layout rather than recomputing it."""
+
+    __slots__ = ["max_size", "cache", "hits", "misses"]
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.cache: OrderedDict[tuple, tuple[tuple[float, float], float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def layout(self, verts, center, label_type: str, dimensions, label_offset=(0, 0)):
+        """The same as layout_label, but cached"""
+        verts = np.asarray(verts, dtype=np.float64).reshape(-1, 2)
+        origin = verts[0] if len(verts) else np.zeros(2)
+        relative = verts - origin
+        rel_center = (center[0] - origin[0], center[1] - origin[1])
+        # Round the key so that floating point error from moving the frame doesn't cause misses
+        key = (
+            np.round(relative, 3).tobytes(),
+            (round(rel_center[0], 3), round(rel_center[1], 3)),
+            label_type,
+            tuple(dimensions),
+            tuple(label_offset),
+        )
+
+        if (result := self.cache.get(key)) is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            result = layout_label(relative, rel_center, label_type, dimensions, label_offset)
+            self.cache[key] = result
+            if len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+
+        (x, y), rot = result
+        return (x + origin[0], y + origin[1]), rot
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+label_layouts = LabelLayoutCache()
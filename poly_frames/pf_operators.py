@@ -1,13 +1,20 @@
 import bpy
 
+from pathlib import Path
+from tempfile import gettempdir
 from mathutils import Vector as V
 from bpy.types import Context, Event
 from bpy.props import BoolProperty, IntProperty, StringProperty
+from .pf_hud import hud
+from .pf_recorder import recorder
+from .pf_redraw import redraws
 from .pf_functions import point_on_node
 from .draw_handlers import draw_callback_px, timer
 from .pf_settings import PolyFramesSettings, FrameItem
 from ..shared.helpers import Polygon, Rectangle, Op, view_to_region, region_to_view, get_active_tree, dpifac
 from ..shared.functions import get_active_area, compare_event_to_kmis
+from ..shared.tracing import tracer
+from ..shared.instrumentation import operator_profiler
 
 handlers = []
 Op.set_logging(True)
@@ -31,10 +38,12 @@ class PolyFramesOperator():
 
     def return_cycle(self, type="RUNNING_MODAL", undo_push=False, redraw=False):
         timer.stop("operator")
+        if hud.enabled and type != "PASS_THROUGH":
+            hud.event_handled()
         if undo_push:
             bpy.ops.ed.undo_push()
-        if redraw and self.area:
-            self.area.tag_redraw()
+        if redraw and self.node_tree:
+            redraws.tag_tree(self.node_tree)
         return {type}
 
     def init_vars(self):
@@ -277,7 +286,7 @@ class POLY_FRAMES_OT_poly_frames_enable(PolyFramesOperator):
                         break
                 else:
                     for frame in reversed(frames):
-                        shape_region = Polygon([view_to_region(area, p) for p in frame["_shape"]])
+                        shape_region = Polygon([view_to_region(area, p) for p in frame.shape.verts])
                         distance = shape_region.distance_to_edges(point=self.mouse_pos_region)
                         if distance < 10:
                             context.window.cursor_modal_set("SCROLL_XY")
@@ -370,7 +379,7 @@ class PF_OT_select_poly_frame(PolyFramesOperator):
 
     def invoke(self, context, event):
         self.set_vars(context, event)
-        self.area.tag_redraw()
+        redraws.tag_tree(self.node_tree)
         self.finished = 0
         return self.execute(context)
 
@@ -450,13 +459,13 @@ class PF_OT_select_poly_frame(PolyFramesOperator):
                 return {"FINISHED"}
             if not self.prev_selected:
                 self.pf.selected = {self.pf.active}
-                self.area.tag_redraw()
+                redraws.tag_tree(self.node_tree)
             bpy.ops.node.move_poly_frames("INVOKE_DEFAULT")
             bpy.ops.ed.undo_push()
             return {"FINISHED"}
         else:
             self.pf.selected = {self.pf.active}
-            self.area.tag_redraw()
+            redraws.tag_tree(self.node_tree)
             bpy.ops.ed.undo_push()
             return {"FINISHED"}
 
@@ -579,7 +588,7 @@ class PF_OT_add_to_poly_frame(PolyFramesOperator):
 
             frame.nodes = frame.nodes.union(selected)
 
-        self.area.tag_redraw()
+        redraws.tag_tree(self.node_tree)
         print(self.frame_id)
 
         return {"FINISHED"}
@@ -593,10 +602,8 @@ class PF_OT_new_poly_frame(PolyFramesOperator):
         self.set_vars(context, event)
         return self.execute(context)
 
-    def redraw_area(self):
-        self.area.tag_redraw()
-
     def execute(self, context: Context):
+        new_frame = None
         if selected := {n for n in self.node_tree.nodes if n.select}:
             # Check whether all selected nodes are within a single frame. If so, add the new frame as a subframe.
             from_frames = set()
@@ -619,13 +626,14 @@ class PF_OT_new_poly_frame(PolyFramesOperator):
                 subframes.add(new_frame)
                 parent.subframes = subframes
 
-        # This is a bad wrong and evil hack to make sure the view is properly updated.
-        # It's needed because for some reason the members of the frames collection property
-        # are not updated when they are drawn next, so using regular area.tag_redraw() wont work.
-        # So this waits a short amount of time and then triggers another redraw manually, hopefully once the collection
-        # property has been updated. However, it isn't reliable, and there is the possibility that the interval will be
-        # too short, and the redraw will not be triggered.
-        bpy.app.timers.register(self.redraw_area, first_interval=.01)
+        # The members of the frames collection aren't updated until after this operator has finished,
+        # so redrawing straight away would draw the old frames. The redraw scheduler waits until the new frame
+        # can be found in the collection.
+        if new_frame:
+            frame_id = new_frame.frame_id
+            redraws.tag_tree(self.node_tree, check=lambda tree: tree.poly_frames.get_frame_by_id(frame_id) is not None)
+        else:
+            redraws.tag_tree(self.node_tree)
         return {"FINISHED"}
 
 
@@ -661,6 +669,70 @@ class PF_OT_select_nodes_in_poly_frame(PolyFramesOperator):
     """Select all the nodes contained within a poly frame"""
 
 
+@Op(category="node", label="Reset timings")
+class PF_OT_reset_poly_frames_timings(PolyFramesOperator):
+    """Clear all of the recorded poly frames timings"""
+
+    @classmethod
+    def poll(cls, context):
+        # This is also used from the preferences
+        return True
+
+    def execute(self, context):
+        timer.reset()
+        operator_profiler.reset()
+        return {"FINISHED"}
+
+
+@Op(category="node", label="Toggle trace")
+class PF_OT_toggle_poly_frames_trace(PolyFramesOperator):
+    """Start recording a trace of what poly frames is doing, or stop recording and save it to a json file that can be
+    opened in chrome://tracing or speedscope"""
+
+    filepath: StringProperty(subtype="FILE_PATH", options={"SKIP_SAVE"})
+
+    def execute(self, context):
+        if not tracer.enabled:
+            tracer.start()
+            self.report({"INFO"}, "Recording poly frames trace")
+            return {"FINISHED"}
+
+        tracer.stop()
+        path = Path(bpy.path.abspath(self.filepath)) if self.filepath else Path(gettempdir()) / "poly_frames_trace.json"
+        try:
+            spans = tracer.write(path)
+        except OSError as error:
+            self.report({"ERROR"}, f"Couldn't save the trace: {error}")
+            return {"CANCELLED"}
+        self.report({"INFO"}, f"Saved {spans} spans to {path}")
+        return {"FINISHED"}
+
+
+@Op(category="node", label="Toggle interaction recording")
+class PF_OT_toggle_poly_frames_recording(PolyFramesOperator):
+    """Start recording the events that the poly frames operators receive, or stop recording and save them with the
+    starting state of the node tree, so that they can be replayed with tools/replay_interactions.py"""
+
+    filepath: StringProperty(subtype="FILE_PATH", options={"SKIP_SAVE"})
+
+    def execute(self, context):
+        if not recorder.enabled:
+            recorder.start(get_active_tree(context))
+            self.report({"INFO"}, "Recording poly frames interactions")
+            return {"FINISHED"}
+
+        recorder.stop()
+        path = self.filepath or str(Path(gettempdir()) / "poly_frames_interaction.json")
+        path = Path(bpy.path.abspath(path))
+        try:
+            events = recorder.write(path)
+        except OSError as error:
+            self.report({"ERROR"}, f"Couldn't save the recording: {error}")
+            return {"CANCELLED"}
+        self.report({"INFO"}, f"Saved {events} events to {path}")
+        return {"FINISHED"}
+
+
 @Op(category="node", invoke=False)
 class PF_OT_set_poly_frames_attr(PolyFramesOperator):
 
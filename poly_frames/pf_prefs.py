@@ -1,6 +1,27 @@
 from bpy.types import UILayout
-from bpy.props import BoolProperty
-from ..shared.ui import draw_enabled_button
+from bpy.props import BoolProperty, FloatProperty, EnumProperty
+from ..shared.ui import draw_enabled_button, draw_inline_prop
+from .pf_hud import hud
+from .draw_handlers import timer
+from ..shared.instrumentation import operator_profiler
+
+
+# These are also synced every time the frames are drawn, but setting them here means that they take effect straight
+# away, even if no node editor is open.
+def record_timings_update(self, context):
+    timer.enabled = self.record_timings
+
+
+def show_hud_update(self, context):
+    hud.enabled = self.show_hud
+
+
+def profile_operators_update(self, context):
+    operator_profiler.enabled = self.profile_operators
+
+
+def operator_budget_update(self, context):
+    operator_profiler.budget = self.operator_budget
 
 
 class PolyFramesPrefs():
@@ -9,8 +30,115 @@ class PolyFramesPrefs():
     layout: UILayout
     poly_frames_enabled: BoolProperty(name="Enable poly frames", default=True)
 
+    simplify_tolerance: FloatProperty(
+        name="Simplify tolerance",
+        description="Remove vertices from frame outlines that are closer than this distance to a straight edge. \
+This reduces the number of vertices created by reroutes and subframes. Set to 0 to disable",
+        default=2,
+        min=0,
+        soft_max=20,
+    )
+
+    hull_mode: EnumProperty(
+        name="Hull mode",
+        description="How the outlines of frames are constructed",
+        items=[
+            ("POINTS", "Padded points", "Pad the corners of every node, and sample circles around reroutes"),
+            ("MINKOWSKI", "Offset hull", "Find the outline of the raw nodes, and then offset it outwards. \
+This uses far fewer points on large frames"),
+        ],
+        default="POINTS",
+    )
+
+    rebuild_budget: FloatProperty(
+        name="Rebuild budget (ms)",
+        description="The maximum time to spend rebuilding frame shapes in a single redraw. \
+Frames that don't fit are rebuilt in the background, and drawn with their previous shape until then",
+        default=8,
+        min=0.5,
+        soft_max=50,
+    )
+
+    threaded_rebuilds: BoolProperty(
+        name="Threaded rebuilds",
+        description="Compute the shapes of frames on worker threads, so that large trees don't block the UI. \
+Frames are drawn with their previous shape until the new one is ready",
+        default=False,
+    )
+
+    event_invalidation: BoolProperty(
+        name="Event driven updates",
+        description="Only check whether the nodes in frames have moved when Blender reports a change, while another \
+tool is running, or once a second, rather than on every redraw",
+        default=True,
+    )
+
+    record_timings: BoolProperty(
+        name="Record timings",
+        description="Record how long each part of drawing the frames takes. \
+The results can be seen in the Poly Frames Performance panel in the node editor sidebar",
+        default=False,
+        update=record_timings_update,
+    )
+
+    show_hud: BoolProperty(
+        name="Show HUD",
+        description="Show the draw time, the number of frames drawn, culled and rebuilt, \
+cache hit rates and event latency in the corner of the node editor",
+        default=False,
+        update=show_hud_update,
+    )
+
+    profile_operators: BoolProperty(
+        name="Profile operators",
+        description="Record how long each poly frames operator takes to run, and what it returns",
+        default=False,
+        update=profile_operators_update,
+    )
+
+    operator_budget: FloatProperty(
+        name="Operator budget (ms)",
+        description="Operator calls that take longer than this are counted as over budget",
+        default=16,
+        min=0.1,
+        soft_max=100,
+        update=operator_budget_update,
+    )
+
     def draw(self, context):
         layout = self.layout
 
         layout = draw_enabled_button(layout, self, "poly_frames_enabled")
-        layout.label(text="Some prefs!")
\ No newline at end of file
+        draw_inline_prop(layout, self, "hull_mode")
+        draw_inline_prop(layout, self, "simplify_tolerance")
+        draw_inline_prop(layout, self, "rebuild_budget")
+        draw_inline_prop(layout, self, "threaded_rebuilds")
+        draw_inline_prop(layout, self, "event_invalidation")
+        draw_inline_prop(layout, self, "record_timings")
+        draw_inline_prop(layout, self, "show_hud")
+        draw_inline_prop(layout, self, "profile_operators")
+        if self.profile_operators:
+            draw_inline_prop(layout, self, "operator_budget")
+            self.draw_operator_stats(layout)
+
+    def draw_operator_stats(self, layout: UILayout):
+        stats = operator_profiler.stats()
+        if not stats:
+            layout.label(text="No operator calls recorded yet")
+            return
+
+        col = layout.box().column(align=True)
+        row = col.row(align=True)
+        for heading in ("Operator", "Calls", "p50", "p95", "Max", "Over budget"):
+            row.label(text=heading)
+        for name, op in stats.items():
+            row = col.row(align=True)
+            row.alert = op["exceeds_budget"]
+            row.label(text=name, icon="ERROR" if op["exceeds_budget"] else "NONE")
+            row.label(text=str(op["calls"]))
+            row.label(text=f"{op['p50']:.2f}")
+            row.label(text=f"{op['p95']:.2f}")
+            row.label(text=f"{op['max']:.2f}")
+            row.label(text=str(op["over_budget"]))
+        col.label(text="Times are in milliseconds, p50 and p95 are rounded up to the nearest histogram bucket")
+        layout.operator("node.reset_poly_frames_timings")
@@ -0,0 +1,94 @@
+"""Recompute and store the shapes of every poly frame in a file, without needing a node editor to draw them.
+This is used by tools/rebake_shapes.py to update files in bulk."""
+import bpy
+from functools import partial
+from time import perf_counter
+from mathutils import Vector as V
+from bpy.types import NodeTree
+from bpy.app.handlers import persistent
+from .draw_handlers import update_frame
+from .pf_storage import migrate_frame
+from .pf_functions import NodeGeometry
+from .pf_scheduler import RebuildScheduler
+from ..shared.functions import get_prefs
+from ..shared.helpers import Rectangle
+
+# There's no view to measure the labels against in background mode, so use a 1080p region at 1:1 zoom.
+DEFAULT_VIEW = Rectangle((0, 0), (1920, 1080))
+DEFAULT_VIEW_SCALE = V((1, 1))
+
+
+def iter_node_trees(data=None):
+    """Yield every node tree in the blend data, including the embedded trees of materials, scenes etc."""
+    data = data or bpy.data
+    yield from data.node_groups
+    for collection in (data.materials, data.scenes, data.worlds, data.lights, data.textures, data.linestyles):
+        for owner in collection:
+            if getattr(owner, "node_tree", None):
+                yield owner.node_tree
+
+
+def rebake_tree(node_tree: NodeTree) -> int:
+    """Rebuild the shape, center and label placement of every frame in a node tree.
+    Returns the number of frames that were rebuilt."""
+    pf = node_tree.poly_frames
+    frames = list(pf.frames)
+    for frame in frames:
+        migrate_frame(frame)
+    to_remove = {f for f in frames if (not f.nodes and not f.subframes) or f.tag_remove}
+    for frame in frames:
+        if frame not in to_remove:
+            frame.tag_shape_update = True
+
+    prefs = get_prefs(bpy.context)
+    rebuild = partial(update_frame, view_rect=DEFAULT_VIEW, view_scale=DEFAULT_VIEW_SCALE, prefs=prefs)
+    # Use a separate scheduler so that the stats of the one used for drawing aren't affected.
+    RebuildScheduler().run(frames, rebuild, ignore=to_remove)
+    # Store the fingerprints of the rebuilt frames, so that they aren't rebuilt again the first time they are drawn
+    geometry = NodeGeometry(node_tree)
+    for frame in frames:
+        if frame not in to_remove:
+            frame.update_fingerprint(geometry)
+
+    if to_remove:
+        pf.remove_frames(to_remove)
+    pf.reorder_frames()
+    pf.prev_frame_number = len(pf.frames)
+    pf.tag_reorder = False
+    return len(frames) - len(to_remove)
+
+
+def rebake_all(data=None) -> dict:
+    """Rebake every node tree with poly frames, and return the number of frames and time taken for each."""
+    results = {}
+    for node_tree in iter_node_trees(data):
+        if not len(node_tree.poly_frames.frames):
+            continue
+        start = perf_counter()
+        frames = rebake_tree(node_tree)
+        results[node_tree.name] = {"frames": frames, "time": perf_counter() - start}
+    return results
+
+
+def migrate_all(data=None) -> int:
+    """Convert the frame data in every node tree to the packed format. Returns the number of frames converted."""
+    converted = 0
+    for node_tree in iter_node_trees(data):
+        for frame in node_tree.poly_frames.frames:
+            converted += bool(migrate_frame(frame))
+    return converted
+
+
+@persistent
+def migrate_storage_handler(*args):
+    # Files saved by older versions store frame data as ID property lists
+    migrate_all()
+
+
+def register():
+    bpy.app.handlers.load_post.append(migrate_storage_handler)
+
+
+def unregister():
+    if migrate_storage_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(migrate_storage_handler)
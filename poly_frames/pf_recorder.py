@@ -0,0 +1,437 @@
+"""Record the events that the poly frames operators receive, along with the state of the node tree when recording
+started, so that an interaction that lags (e.g. dragging a nested frame across a dense tree) can be replayed later
+as a repeatable benchmark.
+Replaying doesn't need a window: the events are fed to the operator methods with a fake context and area,
+and the cpu side of the redraw after each one (change detection and rebuilding) is run without drawing.
+tools/replay_interactions.py does this in background mode."""
+import bpy
+import json
+from pathlib import Path
+from base64 import b64encode, b64decode
+from functools import partial
+from collections import deque
+from time import perf_counter
+from types import SimpleNamespace
+from bpy.types import NodeTree
+from mathutils import Vector as V
+from .draw_handlers import update_frame, check_frame_changed
+from .pf_functions import NodeGeometry
+from .pf_scheduler import RebuildScheduler
+from .pf_rebake import DEFAULT_VIEW, DEFAULT_VIEW_SCALE
+from ..shared.functions import get_prefs, get_active_area
+from ..shared.helpers import operator_event_listeners, region_to_view
+from ..shared.instrumentation import Instrumentation
+
+TRACE_VERSION = 1
+EVENT_MODIFIERS = ("shift", "ctrl", "alt", "oskey")
+
+
+def to_json(value):
+    """Convert ID properties, vectors etc. to plain python values"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, bytes):
+        # Packed frame data
+        return {"__bytes__": b64encode(value).decode()}
+    if hasattr(value, "to_dict"):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        return {k: to_json(v) for k, v in value.items()}
+    try:
+        return [to_json(v) for v in value]
+    except TypeError:
+        return str(value)
+
+
+def capture_tree(node_tree: NodeTree) -> dict:
+    """Get everything needed to recreate a node tree and its poly frames"""
+    nodes = [{
+        "name": node.name,
+        "bl_idname": node.bl_idname,
+        "label": node.label,
+        "location": list(node.location),
+        "width": node.width,
+        "dimensions": list(node.dimensions),
+        "parent": node.parent.name if node.parent else None,
+        "select": node.select,
+        "uid": node.poly_frames.uid,
+    } for node in node_tree.nodes]
+    pf = node_tree.poly_frames
+    active = node_tree.nodes.active
+    return {
+        "name": node_tree.name,
+        "bl_idname": node_tree.bl_idname,
+        "active": active.name if active else None,
+        "nodes": nodes,
+        # The frames only store their data in ID properties, so these can be copied directly
+        "frames": [{key: to_json(value) for key, value in frame.items()} for frame in pf.frames],
+        "frame_order": list(pf.frame_order),
+    }
+
+
+def restore_tree(state: dict) -> NodeTree:
+    """Create a new node group from a captured tree.
+    Node dimensions are only calculated when nodes are drawn, so in background mode they will be 0."""
+    node_tree = bpy.data.node_groups.new(state["name"], state["bl_idname"])
+    nodes = node_tree.nodes
+    for data in state["nodes"]:
+        try:
+            node = nodes.new(data["bl_idname"])
+        except RuntimeError:
+            # Not all node types can be created in all tree types
+            continue
+        node.name = data["name"]
+        node.label = data["label"]
+        node.location = data["location"]
+        node.width = data["width"]
+        node.select = data["select"]
+        node.poly_frames["_uid"] = data["uid"]
+    for data in state["nodes"]:
+        if data["parent"] and data["name"] in nodes and data["parent"] in nodes:
+            nodes[data["name"]].parent = nodes[data["parent"]]
+    if state["active"] in nodes:
+        nodes.active = nodes[state["active"]]
+
+    pf = node_tree.poly_frames
+    for data in state["frames"]:
+        frame = pf.frames.add()
+        for key, value in data.items():
+            if isinstance(value, dict) and "__bytes__" in value:
+                value = b64decode(value["__bytes__"])
+            frame[key] = value
+    pf.frame_order = state["frame_order"]
+    pf.prev_frame_number = len(pf.frames)
+    return node_tree
+
+
+# Recording
+#################################################
+
+
+class InteractionRecorder():
+    """Records every event passed to the invoke and modal methods of the Op operators.
+    Events are kept in a fixed size deque, so a recording left running by accident can't use up all of the memory."""
+
+    __slots__ = ["enabled", "events", "tree_state", "start_time", "dropped"]
+
+    def __init__(self, max_events=50000):
+        self.enabled = False
+        self.events: deque[dict] = deque(maxlen=max_events)
+        self.tree_state: dict = {}
+        self.start_time = 0.0
+        self.dropped = 0
+
+    def start(self, node_tree: NodeTree):
+        self.events.clear()
+        self.dropped = 0
+        self.tree_state = capture_tree(node_tree)
+        self.start_time = perf_counter()
+        self.enabled = True
+        if record_event not in operator_event_listeners:
+            operator_event_listeners.append(record_event)
+
+    def stop(self):
+        self.enabled = False
+        if record_event in operator_event_listeners:
+            operator_event_listeners.remove(record_event)
+
+    def record(self, name: str, operator, context, event):
+        idname, method = name.rsplit(".", 1)
+        data = {
+            "time": perf_counter() - self.start_time,
+            "operator": idname,
+            "method": method,
+            "type": event.type,
+            "value": event.value,
+            "mouse": [event.mouse_x, event.mouse_y],
+            "mouse_prev": [event.mouse_prev_x, event.mouse_prev_y],
+            "mouse_region": [event.mouse_region_x, event.mouse_region_y],
+        }
+        for modifier in EVENT_MODIFIERS:
+            data[modifier] = getattr(event, modifier)
+
+        # The operators work out the area under the mouse themselves, so store the layout and zoom level of that one
+        area = get_active_area(context, V((event.mouse_x, event.mouse_y)), "NODE_EDITOR") or context.area
+        if area and area.type == "NODE_EDITOR" and len(area.regions) > 3:
+            region = area.regions[3]
+            origin = region_to_view(area, (0, 0))
+            scale = region_to_view(area, (1, 1)) - origin
+            data["area"] = [area.x, area.y, area.width, area.height]
+            data["region"] = [region.x, region.y, region.width, region.height]
+            data["view"] = [origin.x, origin.y, scale.x, scale.y]
+
+        if method == "invoke":
+            props = operator.properties
+            data["properties"] = {
+                p.identifier: to_json(getattr(props, p.identifier))
+                for p in props.bl_rna.properties if p.identifier != "rna_type"
+            }
+
+        if len(self.events) == self.events.maxlen:
+            self.dropped += 1
+        self.events.append(data)
+
+    def to_dict(self) -> dict:
+        return {
+            "version": TRACE_VERSION,
+            "blender": bpy.app.version_string,
+            "dropped_events": self.dropped,
+            "tree": self.tree_state,
+            "events": list(self.events),
+        }
+
+    def write(self, path) -> int:
+        """Save the recording as json, and return the number of events written"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        data = self.to_dict()
+        with open(path, "w") as file:
+            json.dump(data, file)
+        return len(data["events"])
+
+
+recorder = InteractionRecorder()
+
+
+def record_event(name, operator, context, event):
+    # A module level function so that it can be found in the listeners list again
+    recorder.record(name, operator, context, event)
+
+
+# Replaying
+#################################################
+
+
+class ReplayView2D():
+    """A view2d with the pan and zoom of a recorded event"""
+
+    def __init__(self):
+        self.origin = (0.0, 0.0)
+        self.scale = (1.0, 1.0)
+
+    def region_to_view(self, x, y):
+        return self.origin[0] + x * self.scale[0], self.origin[1] + y * self.scale[1]
+
+    def view_to_region(self, x, y, clip=True):
+        return (x - self.origin[0]) / self.scale[0], (y - self.origin[1]) / self.scale[1]
+
+
+class ReplayArea():
+    """Just enough of a node editor area for the operators, laid out the same as in a recorded event"""
+
+    type = "NODE_EDITOR"
+
+    def __init__(self, node_tree: NodeTree):
+        self.x = self.y = 0
+        self.width, self.height = 1920, 1080
+        self.region = SimpleNamespace(x=0, y=0, width=1920, height=1080, view2d=ReplayView2D())
+        # The window region of a node editor is the fourth one
+        self.regions = [None, None, None, self.region]
+        self.spaces = [SimpleNamespace(type="NODE_EDITOR", node_tree=node_tree, edit_tree=node_tree)]
+
+    def update(self, event: dict):
+        if "area" in event:
+            self.x, self.y, self.width, self.height = event["area"]
+            region = self.region
+            region.x, region.y, region.width, region.height = event["region"]
+            view = event["view"]
+            region.view2d.origin = (view[0], view[1])
+            region.view2d.scale = (view[2] or 1.0, view[3] or 1.0)
+
+    def tag_redraw(self):
+        pass
+
+
+class ReplayContext():
+    """Stands in for bpy.context while replaying. Anything that isn't faked falls back to the real context."""
+
+    def __init__(self, node_tree: NodeTree, area: ReplayArea):
+        self.node_tree = node_tree
+        self.area = area
+        self.region = area.region
+        self.space_data = area.spaces[0]
+        self.screen = SimpleNamespace(areas=[area])
+        self.window = SimpleNamespace(cursor_modal_set=lambda cursor: None, cursor_modal_restore=lambda: None,
+                                      cursor_set=lambda cursor: None)
+        self.window_manager = SimpleNamespace(modal_handler_add=lambda operator: True)
+
+    @property
+    def active_node(self):
+        return self.node_tree.nodes.active
+
+    def __getattr__(self, name):
+        return getattr(bpy.context, name)
+
+
+class ReplayOps():
+    """Replaces bpy.ops while replaying. Operators that are called by other operators were recorded separately,
+    so running them again here would apply them twice."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, category):
+        if category.startswith("__"):
+            raise AttributeError(category)
+        return _ReplayOpsCategory(self, category)
+
+
+class _ReplayOpsCategory():
+
+    def __init__(self, ops: ReplayOps, category: str):
+        self.ops = ops
+        self.category = category
+
+    def __getattr__(self, name):
+
+        def call(*args, **kwargs):
+            self.ops.calls.append(f"{self.category}.{name}")
+            return {"FINISHED"}
+
+        return call
+
+
+def make_event(data: dict):
+    event = SimpleNamespace(
+        type=data["type"],
+        value=data["value"],
+        mouse_x=data["mouse"][0],
+        mouse_y=data["mouse"][1],
+        mouse_prev_x=data["mouse_prev"][0],
+        mouse_prev_y=data["mouse_prev"][1],
+        mouse_region_x=data["mouse_region"][0],
+        mouse_region_y=data["mouse_region"][1],
+        is_repeat=False,
+    )
+    for modifier in EVENT_MODIFIERS:
+        setattr(event, modifier, data.get(modifier, False))
+    return event
+
+
+def make_replay_operator(operator_cls, properties: dict):
+    """Operator classes can't be instantiated outside of Blender's event system, so create an instance of a plain
+    python subclass of the class that was decorated with Op, with the recorded properties as attributes."""
+    user_cls = next(c for c in operator_cls.__mro__ if not issubclass(c, bpy.types.Operator))
+    replay_cls = type(f"Replay{user_cls.__name__}", (user_cls, ), {
+        "bl_idname": operator_cls.bl_idname,
+        "report": lambda self, type, message: None,
+    })
+    operator = replay_cls()
+    for cls in reversed(user_cls.__mro__):
+        for name, prop in getattr(cls, "__annotations__", {}).items():
+            if isinstance(prop, bpy.props._PropertyDeferred):
+                setattr(operator, name, properties.get(name, prop.keywords.get("default")))
+    return operator
+
+
+def redraw(node_tree: NodeTree, scheduler: RebuildScheduler, rebuild) -> int:
+    """Do the same work as the draw callback, apart from culling and drawing. Returns the number of frames rebuilt."""
+    pf = node_tree.poly_frames
+    frames = pf.ordered_frames(reverse=True)
+    to_remove = set()
+    geometry = NodeGeometry(node_tree)
+    for frame in frames:
+        nodes = frame.nodes
+        if (not len(nodes) and not frame.subframes) or frame.tag_remove:
+            to_remove.add(frame)
+            continue
+        check_frame_changed(frame, geometry)
+    scheduler.run(frames, rebuild, ignore=to_remove)
+    if to_remove:
+        pf.remove_frames(to_remove)
+    if pf.tag_reorder or pf.prev_frame_number != len(pf.frames):
+        pf.reorder_frames()
+        pf.prev_frame_number = len(pf.frames)
+    return scheduler.last_rebuilds
+
+
+def replay(trace: dict, operator_classes: dict[str, type]) -> dict:
+    """Feed the events of a recording through the operators, and time how long each one takes to handle,
+    and how long the redraw after it takes. operator_classes maps bl_idnames to the registered classes."""
+    node_tree = restore_tree(trace["tree"])
+    area = ReplayArea(node_tree)
+    context = ReplayContext(node_tree, area)
+    scheduler = RebuildScheduler()
+    rebuild = partial(update_frame, view_rect=DEFAULT_VIEW, view_scale=DEFAULT_VIEW_SCALE, prefs=get_prefs(bpy.context))
+    # Build all of the frames first, so that the first event isn't charged for it
+    for frame in node_tree.poly_frames.frames:
+        frame["_tag_shape_update"] = True
+    redraw(node_tree, scheduler, rebuild)
+
+    timings = Instrumentation(size=max(1, len(trace["events"])), enabled=True)
+    running = {}
+    results = []
+    real_ops = bpy.ops
+    bpy.ops = ops = ReplayOps()
+    try:
+        for i, data in enumerate(trace["events"]):
+            area.update(data)
+            event = make_event(data)
+            idname, method = data["operator"], data["method"]
+            result = {"index": i, "operator": idname, "method": method, "type": event.type, "value": event.value}
+            results.append(result)
+
+            if method == "invoke":
+                operator_cls = operator_classes.get(idname)
+                if not operator_cls:
+                    result["error"] = "unknown operator"
+                    continue
+                operator = running[idname] = make_replay_operator(operator_cls, data.get("properties", {}))
+            elif not (operator := running.get(idname)):
+                # The invoke event wasn't recorded, so there's nothing to pass this event to
+                result["error"] = "no running operator"
+                continue
+
+            ops.calls.clear()
+            start = perf_counter()
+            try:
+                if method == "invoke" and not hasattr(operator, "invoke"):
+                    status = operator.execute(context)
+                else:
+                    status = getattr(operator, method)(context, event)
+            except Exception as error:
+                status = {"ERROR"}
+                result["error"] = f"{type(error).__name__}: {error}"
+            handle_time = perf_counter() - start
+
+            start = perf_counter()
+            result["rebuilt"] = redraw(node_tree, scheduler, rebuild)
+            redraw_time = perf_counter() - start
+
+            status = set(status) if isinstance(status, (set, frozenset)) else {str(status)}
+            # Modal operators keep running when they pass an event through, but invoke has to start the modal
+            if status & {"FINISHED", "CANCELLED", "ERROR"} or (method == "invoke" and "RUNNING_MODAL" not in status):
+                running.pop(idname, None)
+            result.update({
+                "status": "|".join(sorted(status)),
+                "handle_ms": handle_time * 1000,
+                "redraw_ms": redraw_time * 1000,
+                "nested_operators": list(ops.calls),
+            })
+            timings.record(f"{idname}.{method}", handle_time)
+            timings.record(f"{idname}.{method} + redraw", handle_time + redraw_time)
+    finally:
+        bpy.ops = real_ops
+        bpy.data.node_groups.remove(node_tree)
+
+    return {
+        "events": results,
+        "errors": sum("error" in r for r in results),
+        "summary": timings.stats(),
+    }
+
+
+def get_operator_classes(*modules) -> dict[str, type]:
+    """Find all of the operators defined in these modules, by bl_idname"""
+    classes = {}
+    for module in modules:
+        for value in vars(module).values():
+            if isinstance(value, type) and issubclass(value, bpy.types.Operator) and hasattr(value, "bl_idname"):
+                classes[value.bl_idname] = value
+    return classes
+
+
+def read_trace(path) -> dict:
+    trace = json.loads(Path(path).read_text())
+    if trace.get("version") != TRACE_VERSION:
+        raise ValueError(f"Unsupported interaction trace version: {trace.get('version')}")
+    return trace
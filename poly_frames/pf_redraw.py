@@ -0,0 +1,150 @@
+"""Redraws only the node editors that show a particular tree.
+
+Operators, the rebuild queue and the worker threads all need the frames of a tree to be redrawn after they change
+them. Rather than tagging areas straight away (which can draw the frames collection before it has been updated),
+requests are collected, and a timer with no interval tags the areas once the current operator or handler has
+finished. Any number of requests for the same tree during one tick only tag each of its areas once.
+
+bpy.app.timers are run by the window manager at the start of each pass of the event loop, before the event handlers
+(which is where operators run) and before the areas are drawn. So a timer registered by an operator can't run until
+the next pass, after the operator has returned. That is also true of the 10ms timer that new_poly_frame used to
+use though, so the timing alone doesn't prove that the frames collection is up to date by then. Instead, a request
+can come with a check that is run when the timer fires. If it fails, the tree isn't redrawn yet, and it is checked
+again on the next pass, up to MAX_RETRIES times, after which it's redrawn anyway."""
+import bpy
+from typing import Callable, Iterator, Optional
+from mathutils import Vector as V
+from bpy.types import Area, NodeTree
+from ..shared.helpers import Rectangle, region_to_view
+
+# The number of passes of the event loop to wait for a check to pass, before redrawing anyway
+MAX_RETRIES = 10
+
+
+def displayed_tree(area: Area):
+    """Get the tree that is drawn in a node editor. When editing a node group, this is the group."""
+    space = area.spaces.active
+    return getattr(space, "edit_tree", None) or getattr(space, "node_tree", None)
+
+
+def node_editor_areas() -> Iterator[Area]:
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == "NODE_EDITOR":
+                yield area
+
+
+def area_view(area: Area) -> tuple[Rectangle, V]:
+    """Get the part of the view that a node editor shows, and the size of one of its pixels in view space"""
+    view_rect = Rectangle(region_to_view(area, (0, 0)), (region_to_view(area, (area.width, area.height))))
+    view_scale = region_to_view(area, (1, 1)) - region_to_view(area, (0, 0))
+    return view_rect, view_scale
+
+
+def tree_view(pointer: int) -> Optional[tuple[Rectangle, V]]:
+    """Get the view of the first node editor that currently shows a tree, or None if none of them do"""
+    for area in node_editor_areas():
+        tree = displayed_tree(area)
+        if tree and tree.as_pointer() == pointer:
+            return area_view(area)
+    return None
+
+
+class RedrawScheduler():
+    """Collects the trees that need to be redrawn during a tick, and redraws the areas that show them"""
+
+    __slots__ = ["trees", "all_trees", "timer_registered", "checks", "requests", "flushes", "tagged_areas", "retries"]
+
+    def __init__(self):
+        # Pointers of the trees to redraw
+        self.trees: set[int] = set()
+        self.all_trees = False
+        self.timer_registered = False
+        # tree pointer: (check, number of times it has failed)
+        self.checks: dict[int, tuple[Callable[[NodeTree], bool], int]] = {}
+        self.requests = 0
+        self.flushes = 0
+        self.tagged_areas = 0
+        self.retries = 0
+
+    def tag_tree(self, node_tree: NodeTree, check: Optional[Callable[[NodeTree], bool]] = None):
+        """Redraw every area that shows this tree, once the current operator or handler has finished.
+        If a check is given, the tree is only redrawn once check(node_tree) returns True (see the module docstring)."""
+        if node_tree:
+            if check:
+                self.checks[node_tree.as_pointer()] = (check, 0)
+            self.tag_tree_pointer(node_tree.as_pointer())
+
+    def tag_tree_pointer(self, pointer: int):
+        self.trees.add(pointer)
+        self.request()
+
+    def tag_all(self):
+        """Redraw every node editor"""
+        self.all_trees = True
+        self.request()
+
+    def request(self):
+        self.requests += 1
+        if not self.timer_registered:
+            bpy.app.timers.register(flush_redraws, first_interval=0)
+            self.timer_registered = True
+
+    def flush(self):
+        """Tag the areas that show the requested trees for redrawing"""
+        # tree pointer: whether its check passed, or it doesn't have one
+        ready: dict[int, bool] = {}
+        if self.trees or self.all_trees:
+            for area in node_editor_areas():
+                if not (tree := displayed_tree(area)):
+                    continue
+                pointer = tree.as_pointer()
+                if not self.all_trees and pointer not in self.trees:
+                    continue
+                if pointer not in ready:
+                    check = self.checks.get(pointer)
+                    ready[pointer] = not check or check[1] >= MAX_RETRIES or check[0](tree)
+                if ready[pointer]:
+                    area.tag_redraw()
+                    self.tagged_areas += 1
+            self.flushes += 1
+
+        waiting = {p: (check, tries + 1) for p, (check, tries) in self.checks.items() if ready.get(p) is False}
+        self.trees.clear()
+        self.all_trees = False
+        self.checks = waiting
+        if waiting:
+            self.retries += 1
+            self.trees.update(waiting)
+            self.request()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "flushes": self.flushes,
+            "tagged_areas": self.tagged_areas,
+            "retries": self.retries,
+        }
+
+    def reset(self):
+        self.trees.clear()
+        self.checks.clear()
+        self.all_trees = False
+        self.requests = self.flushes = self.tagged_areas = self.retries = 0
+
+
+redraws = RedrawScheduler()
+
+
+def flush_redraws():
+    # Timers are identified by the function object, so this can't be a bound method.
+    redraws.timer_registered = False
+    redraws.flush()
+    return None
+
+
+def unregister():
+    if bpy.app.timers.is_registered(flush_redraws):
+        bpy.app.timers.unregister(flush_redraws)
+    redraws.timer_registered = False
+    redraws.reset()
@@ -0,0 +1,201 @@
+import bpy
+from time import perf_counter
+from typing import Callable, Optional
+from collections import deque, OrderedDict
+from bpy.app.handlers import persistent
+from bpy.types import NodeTree
+from .pf_settings import FrameItem
+from .pf_redraw import redraws, tree_view
+from ..shared.functions import get_prefs
+
+
+class RebuildScheduler():
+    """Rebuilds the shapes of all dirty frames exactly once per redraw.
+    Frames are rebuilt deepest first, so that parent frames are always built around the up to date shapes
+    of their subframes, rather than being rebuilt a second time on the next redraw.
+
+    Frames that are off screen, or that don't fit into the time budget of a redraw, are added to a queue
+    that is worked through in small time slices by a bpy.app.timers callback."""
+
+    __slots__ = ["last_order", "total_rebuilds", "passes", "queue", "slice_times", "slices", "timer_registered"]
+
+    def __init__(self):
+        self.last_order: list[int] = []
+        self.total_rebuilds = 0
+        self.passes = 0
+        # Maps (node tree pointer, frame id) to (node tree, frame id, rebuild function)
+        self.queue: OrderedDict[tuple[int, int], tuple[NodeTree, int, Callable]] = OrderedDict()
+        self.slice_times: deque[float] = deque(maxlen=100)
+        self.slices = 0
+        self.timer_registered = False
+
+    @property
+    def last_rebuilds(self) -> int:
+        """The number of frames rebuilt in the most recent pass"""
+        return len(self.last_order)
+
+    @staticmethod
+    def is_dirty(frame: FrameItem) -> bool:
+        return frame.tag_shape_update or frame.tag_label_update
+
+    @staticmethod
+    def depth(frame: FrameItem) -> int:
+        """How deeply nested this frame is inside other frames"""
+        return len(frame.all_parents)
+
+    def collect(self, frames: list[FrameItem], ignore: Optional[set[FrameItem]] = None) -> list[FrameItem]:
+        """Get all of the dirty frames, along with the parents that need to be rebuilt around them,
+        ordered from the most deeply nested to the least."""
+        ignore = ignore or set()
+        dirty = set()
+        for frame in frames:
+            if frame in ignore or not self.is_dirty(frame):
+                continue
+            dirty.add(frame)
+            dirty.update(frame.all_parents)
+        dirty -= ignore
+        return sorted(dirty, key=self.depth, reverse=True)
+
+    def rebuild_ordered(self, order: list[FrameItem], rebuild: Callable[[FrameItem], bool], budget=0.0):
+        """Rebuild the frames in the given order until the budget (in milliseconds) runs out.
+        At least one frame is always attempted. If the rebuild function returns False, the rebuild is still
+        in progress elsewhere (e.g. on a worker thread), and the frame is left dirty.
+        Returns the frames that were rebuilt, and the frames that didn't fit into the budget."""
+        start = perf_counter()
+        rebuilt = []
+        for i, frame in enumerate(order):
+            if budget and i and (perf_counter() - start) * 1000 > budget:
+                self.total_rebuilds += len(rebuilt)
+                return rebuilt, order[i:]
+            if rebuild(frame) is False:
+                continue
+            frame.tag_shape_update = False
+            rebuilt.append(frame)
+        self.total_rebuilds += len(rebuilt)
+        return rebuilt, []
+
+    def run(
+        self,
+        frames: list[FrameItem],
+        rebuild: Callable[[FrameItem], bool],
+        ignore: Optional[set[FrameItem]] = None,
+        budget=0.0,
+    ) -> list[FrameItem]:
+        """Rebuild every dirty frame in the given list with the rebuild function, children first.
+        If a budget in milliseconds is given, the frames that didn't fit into it are left dirty and returned."""
+        order = self.collect(frames, ignore=ignore)
+        rebuilt, leftover = self.rebuild_ordered(order, rebuild, budget=budget)
+        self.last_order = [frame.frame_id for frame in rebuilt]
+        self.passes += 1
+        return leftover
+
+    def enqueue(self, node_tree: NodeTree, frame: FrameItem, rebuild: Callable[[FrameItem], bool]):
+        """Add a dirty frame to be rebuilt in the background"""
+        self.queue[(node_tree.as_pointer(), frame.frame_id)] = (node_tree, frame.frame_id, rebuild)
+        if not self.timer_registered:
+            bpy.app.timers.register(process_queue, first_interval=0)
+            self.timer_registered = True
+
+    def clear_queue(self):
+        self.queue.clear()
+
+    def process_queue(self):
+        """Timer callback that rebuilds as many queued frames as fit in the budget"""
+        if not self.queue:
+            self.timer_registered = False
+            return None
+
+        start = perf_counter()
+        # Resolve the queued ids to frames, skipping any that have been removed or rebuilt since.
+        pending = []
+        for key, (node_tree, frame_id, rebuild) in list(self.queue.items()):
+            frame = node_tree.poly_frames.get_frame_by_id(frame_id)
+            if frame is None or not self.is_dirty(frame):
+                del self.queue[key]
+                continue
+            pending.append((self.depth(frame), key, frame, rebuild))
+        pending.sort(key=lambda item: item[0], reverse=True)
+
+        budget = get_prefs(bpy.context).rebuild_budget
+        rebuilt = 0
+        # The view that the rebuild functions were made with could be out of date, or be from a different editor,
+        # so the labels are laid out for an editor that shows the tree now.
+        views = {}
+        for i, (_, key, frame, rebuild) in enumerate(pending):
+            if i and (perf_counter() - start) * 1000 > budget:
+                break
+            if key[0] not in views:
+                views[key[0]] = tree_view(key[0])
+            if view := views[key[0]]:
+                result = rebuild(frame, view_rect=view[0], view_scale=view[1])
+            else:
+                result = rebuild(frame)
+            if result is False:
+                continue
+            frame.tag_shape_update = False
+            # The parent may have been rebuilt around the old shape of this frame while it was queued
+            if parent := frame.parent:
+                parent.tag_shape_update = True
+            rebuilt += 1
+            del self.queue[key]
+            # Only redraw the areas that show the trees that have changed
+            redraws.tag_tree_pointer(key[0])
+        self.total_rebuilds += rebuilt
+
+        self.slice_times.append(perf_counter() - start)
+        self.slices += 1
+        if self.queue:
+            # Wait a bit longer if everything is still being computed on other threads
+            return 0.001 if rebuilt else 0.01
+        self.timer_registered = False
+        return None
+
+    def stats(self) -> dict:
+        """Get statistics about the rebuilds, with times in milliseconds"""
+        slice_times = [t * 1000 for t in self.slice_times]
+        return {
+            "queue_depth": len(self.queue),
+            "passes": self.passes,
+            "last_rebuilds": self.last_rebuilds,
+            "total_rebuilds": self.total_rebuilds,
+            "slices": self.slices,
+            "last_slice_ms": slice_times[-1] if slice_times else 0.0,
+            "max_slice_ms": max(slice_times) if slice_times else 0.0,
+            "mean_slice_ms": sum(slice_times) / len(slice_times) if slice_times else 0.0,
+        }
+
+
+scheduler = RebuildScheduler()
+
+
+def process_queue():
+    # Timers are identified by the function object, so this can't be a bound method.
+    return scheduler.process_queue()
+
+
+@persistent
+def clear_queue_handler(*args):
+    # The queue holds references to node trees, which aren't valid after undo or loading a new file.
+    scheduler.clear_queue()
+
+
+queue_handlers = [
+    bpy.app.handlers.load_pre,
+    bpy.app.handlers.undo_pre,
+    bpy.app.handlers.redo_pre,
+]
+
+
+def register():
+    for handlers in queue_handlers:
+        handlers.append(clear_queue_handler)
+
+
+def unregister():
+    for handlers in queue_handlers:
+        if clear_queue_handler in handlers:
+            handlers.remove(clear_queue_handler)
+    if bpy.app.timers.is_registered(process_queue):
+        bpy.app.timers.unregister(process_queue)
+    scheduler.clear_queue()
+    scheduler.timer_registered = False
@@ -1,31 +1,83 @@
 from colorsys import hsv_to_rgb
 import bpy
-import inspect
-from random import random
+from itertools import count
+from random import random, randrange
+from typing import Optional
+from bpy.app.handlers import persistent
 from mathutils import Vector as V
 from bpy.props import PointerProperty, CollectionProperty, BoolProperty, FloatVectorProperty, IntProperty,\
     StringProperty, FloatProperty, EnumProperty, IntVectorProperty
 from bpy.types import PropertyGroup
-from .pf_functions import point_on_node
-from ..shared.helpers import Polygon, get_uid, region_to_view, view_to_region
-
-
-def PyObjectProperty(type, set_func, var_name=""):
-    """Create a property to represent a python object."""
-    obj = type  # Dont use python keywords
-    del type
-    if not var_name:
-        # Try and get the name of the variable that the property is assigned to.
-        code_line = inspect.stack()[1].code_context[0]  # This is the line where the variable is assigned.
-        # This isolates the variable name on the left side of the =
-        var_name = code_line.replace(" ", "").split("=")[0].split(":")[0]
-
-    # Create a property that stores the object indirectly
-    prop = property(
-        fget=lambda self: obj(self.get("_" + var_name, [])),
-        fset=lambda self, value: set_func(self, "_" + var_name, value),
-    )
-    return prop
+from .pf_functions import NodeGeometry, point_on_node
+from .pf_storage import SHAPE_KEYS, read_array, write_array, write_points
+from ..shared.helpers import Polygon, PolygonView, get_uid, region_to_view, view_to_region
+from ..shared.tracing import traced
+
+
+# Every write to a PyObjectProperty gets a new version. They start at a random number, so that the versions saved in a
+# file by a previous session are very unlikely to match the ones in the cache. They need to fit in a 32 bit ID property.
+_versions = count(randrange(1 << 30))
+py_object_properties = []
+
+
+class PyObjectProperty():
+    """A property that stores a python object in an ID property of the same name with an underscore in front.
+    The object is cached per instance, and every read returns the same object until the property is set again,
+    so `type` should be immutable (e.g. PolygonView)."""
+
+    __slots__ = ["type", "get_func", "set_func", "key", "version_key", "cache"]
+
+    def __init__(self, type, get_func, set_func):
+        self.type = type
+        self.get_func = get_func
+        self.set_func = set_func
+        self.key = ""
+        self.version_key = ""
+        # pointer: (version, object)
+        self.cache = {}
+        py_object_properties.append(self)
+
+    def __set_name__(self, owner, name):
+        self.key = "_" + name
+        self.version_key = f"_{name}_version"
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        # The version is stored alongside the value, so undo, redo and frames that move in memory all invalidate it.
+        version = instance.get(self.version_key)
+        if version is None:
+            return self.type(self.get_func(instance, self.key))
+
+        pointer = instance.as_pointer()
+        cached = self.cache.get(pointer)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        value = self.type(self.get_func(instance, self.key))
+        self.cache[pointer] = (version, value)
+        return value
+
+    def __set__(self, instance, value):
+        self.set_func(instance, self.key, value)
+        version = next(_versions) & 0x7fffffff
+        instance[self.version_key] = version
+        # The object is only built when it's next read, since some properties (e.g. shape_region) are set on every
+        # redraw but rarely read. It's built from what was actually stored, which may not be exactly what was set
+        # (e.g. quantised shapes), so reading it gives the same result as after undo or reloading the file.
+        self.cache.pop(instance.as_pointer(), None)
+
+
+@persistent
+def clear_py_object_caches(*args):
+    for prop in py_object_properties:
+        prop.cache.clear()
+
+
+def discard_py_object_caches(instance):
+    """Forget the cached objects of something that is about to be removed"""
+    pointer = instance.as_pointer()
+    for prop in py_object_properties:
+        prop.cache.pop(pointer, None)
 
 
 class FrameItem(PropertyGroup):
@@ -166,11 +218,11 @@ class FrameItem(PropertyGroup):
     all_parents: set = property(fget=get_all_parents)
 
     def subframes_set(self, frames):
-        self["_subframes"] = [f.frame_id for f in frames if f != self]
+        write_array(self, "_subframes", [f.frame_id for f in frames if f != self], "<i4")
         self.tag_shape_update = True
 
     def subframes_get(self):
-        frame_ids = self.get("_subframes", [])
+        frame_ids = read_array(self, "_subframes", "<i4").tolist()
         pf = self.id_data.poly_frames
         frames = [pf.get_frame_by_id(i) for i in frame_ids]
         # frames = [self.id_data.poly_frames.frames[i] for i in frame_ids]
@@ -204,15 +256,19 @@ class FrameItem(PropertyGroup):
 
     select: BoolProperty(default=False)
 
+    def _polygon_get(self, prop_name):
+        return read_array(self, prop_name, "<f4", 2).tolist()
+
     def _polygon_set(self, prop_name, value):
-        if isinstance(value, Polygon):
-            self[prop_name] = value.verts
+        verts = value.verts if isinstance(value, Polygon) else value
+        if prop_name in SHAPE_KEYS:
+            write_points(self, prop_name, verts)
         else:
-            self[prop_name] = value
+            write_array(self, prop_name, verts, "<f4", 2)
 
-    shape: Polygon = PyObjectProperty(type=Polygon, set_func=_polygon_set)
+    shape: PolygonView = PyObjectProperty(type=PolygonView, get_func=_polygon_get, set_func=_polygon_set)
 
-    shape_region: Polygon = PyObjectProperty(type=Polygon, set_func=_polygon_set)
+    shape_region: PolygonView = PyObjectProperty(type=PolygonView, get_func=_polygon_get, set_func=_polygon_set)
 
     def remove_nodes(self, nodes):
         current_nodes = set(self.nodes)
@@ -225,14 +281,17 @@ class FrameItem(PropertyGroup):
             return True
         return False
 
-    def update_loc_dims(self):
-        locs = []
-        dims = []
-        for node in self.all_nodes():
-            locs.append(node.location)
-            dims.append(node.dimensions)
-        self["_locations"] = locs
-        self["_dimensions"] = dims
+    def update_fingerprint(self, geometry: Optional[NodeGeometry] = None) -> bool:
+        """Store a hash of the locations and dimensions of all of the nodes in this frame.
+        Returns True if it's different to the one stored before, meaning that a node has moved or been resized.
+        Pass geometry when checking lots of frames, so that the nodes are only read once."""
+        if geometry is None:
+            geometry = NodeGeometry(self.id_data)
+        fingerprint = geometry.fingerprint(self.all_nodes())
+        if self.get("_fingerprint") == fingerprint:
+            return False
+        self["_fingerprint"] = fingerprint
+        return True
 
     def all_nodes(self, subframes=False):
         """Gets all nodes in this frame, plus all nodes in Blender frames that are children of this frame.
@@ -258,8 +317,7 @@ class FrameItem(PropertyGroup):
     def nodes(self):
         """Since we can't keep direct references to nodes as python objects (they are replaced by blender often),
         We instead create a unique ID for each node, and only store those."""
-        all_uids = self.get("_node_uids", [])
-        all_uids = set(all_uids)
+        all_uids = set(read_array(self, "_node_uids", "<i4").tolist())
 
         unfound_uids = all_uids.copy()
         nodes = set()
@@ -272,21 +330,19 @@ class FrameItem(PropertyGroup):
                     # Assign a new uid to any nodes that have been duplicated
                     n.poly_frames.uid_set()
                     all_uids.add(n.poly_frames.uid)
-                    self["_locations"] = list(self["_locations"]) + [n.location]
-                    self["_dimensions"] = list(self["_dimensions"]) + [n.dimensions]
-                    self["_node_uids"] = list(all_uids)
+                    write_array(self, "_node_uids", list(all_uids), "<i4")
 
                 nodes.add(n)
 
         # assume that the node has been removed
         if unfound_uids:
-            all_uids = set(self["_node_uids"])
+            all_uids = set(read_array(self, "_node_uids", "<i4").tolist())
             for uid in unfound_uids:
                 try:
                     all_uids.remove(uid)
                 except ValueError:
                     pass
-            self["_node_uids"] = list(all_uids)
+            write_array(self, "_node_uids", list(all_uids), "<i4")
 
         return nodes
 
@@ -299,7 +355,6 @@ class FrameItem(PropertyGroup):
         if not nodes:
             self.tag_remove = True
 
-        self.update_loc_dims()
         uids = []
 
         for n in nodes:
@@ -316,7 +371,7 @@ class FrameItem(PropertyGroup):
                 frame.remove_nodes(nodes)
 
         self.tag_shape_update = True
-        self["_node_uids"] = uids
+        write_array(self, "_node_uids", uids, "<i4")
 
     def move(self, difference: V):
         nodes = self.nodes
@@ -365,6 +420,7 @@ class PolyFramesSettings(PropertyGroup):
         i = 0
         for f in self.frames:
             if f in frames:
+                discard_py_object_caches(f)
                 self.frames.remove(i)
             else:
                 i += 1
@@ -396,16 +452,21 @@ class PolyFramesSettings(PropertyGroup):
             if node in frame.nodes:
                 return frame
 
+    @traced(tags=lambda self, *args, **kwargs: {"tree": self.id_data.name})
     def point_in_frame(self, area, point: V, ignore=set(), shape_name="shape"):
         if not isinstance(ignore, set):
             ignore = {ignore}
         for frame in self.ordered_frames(reverse=True):
             if frame in ignore:
                 continue
-            shape_region = Polygon([view_to_region(area, p) for p in frame["_" + shape_name]])
+            verts = getattr(frame, shape_name).verts
+            if not verts:
+                continue
+            shape_region = Polygon([view_to_region(area, p) for p in verts])
             if shape_region.is_inside(point):
                 return frame
 
+    @traced(tags=lambda self, *args, **kwargs: {"tree": self.id_data.name})
     def point_on_frame_edge(self, area, point: V, max_distance=10, check_nodes=True) -> FrameItem:
         """Returns the frame that the point is on the edge of, or None if it is not on an edge"""
         if check_nodes:
@@ -414,7 +475,7 @@ class PolyFramesSettings(PropertyGroup):
 
         for frame in self.ordered_frames(reverse=True):
 
-            shape = Polygon([view_to_region(area, p) for p in frame["_shape"]])
+            shape = Polygon([view_to_region(area, p) for p in frame.shape.verts])
             distance = shape.distance_to_edges(point=point)
             if distance < max_distance:
                 return frame
@@ -480,12 +541,27 @@ class PolyFramesNodeSettings(PropertyGroup):
     pf_parent: FrameItem = property(pf_parent_get)
 
 
+cache_handlers = [
+    bpy.app.handlers.load_post,
+    bpy.app.handlers.undo_post,
+    bpy.app.handlers.redo_post,
+]
+
+
 def register():
     PolyFramesSettings.frames = CollectionProperty(type=FrameItem)
     bpy.types.NodeTree.poly_frames = PointerProperty(type=PolyFramesSettings)
     bpy.types.Node.poly_frames = PointerProperty(type=PolyFramesNodeSettings)
+    # The pointers in the caches could be reused by a different frame in a new file, and undo and redo
+    # replace all of the frames, so the old entries would never be used again.
+    for handlers in cache_handlers:
+        handlers.append(clear_py_object_caches)
 
 
 def unregister():
     del bpy.types.NodeTree.poly_frames
     del bpy.types.Node.poly_frames
+    for handlers in cache_handlers:
+        if clear_py_object_caches in handlers:
+            handlers.remove(clear_py_object_caches)
+    clear_py_object_caches()
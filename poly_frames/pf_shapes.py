@@ -0,0 +1,146 @@
+import numpy as np
+from math import sin, cos, tau, atan2, ceil
+from mathutils import Vector as V
+from mathutils.geometry import convex_hull_2d
+from ..shared.functions import get_node_loc
+from ..shared.helpers import Polygon, dpifac
+
+
+def get_hull_points(frame, nodes, offset=20, reroute_res=12) -> list:
+    """Get the list of points that the convex hull of a frame is built from.
+    This is the corners of every node padded by the offset, a circle of points around every reroute,
+    and the offset outline of every subframe."""
+    # Get a list of the corners of every node
+    reroute_offset = offset * 2
+    points = []
+    extend = points.extend
+    append = points.append
+    for other_frame in frame.subframes:
+        other_shape = other_frame.shape
+        verts = other_shape.verts
+        normals = other_shape.normals()
+        new_verts = []
+        for v, n in zip(verts, normals):
+            new_verts.append(v + n * offset)
+        extend(new_verts)
+
+    for node in nodes:
+        if node.parent and node.parent in nodes:
+            # if the node is in a frame, it doesn't need to be included
+            continue
+        if node.type == "REROUTE":
+            # If reroute then generate points in a circle around it
+            # to create a smooth corner for the convex hull.
+            # This is less efficient than using bezier smoothing after the convex hull,
+            # but that doesn't give good results for single reroutes
+            loc = node.location * dpifac()
+            for i in range(reroute_res):
+                fac = i / reroute_res * tau
+                x = sin(fac) * reroute_offset
+                y = cos(fac) * reroute_offset
+                append((loc[0] + x, loc[1] + y))
+
+        else:
+            # add each corner of the node + an offset
+            loc = get_node_loc(node) * dpifac() - V((offset, -offset))
+            orig_dims = node.dimensions + V((offset * 2, offset * 2))
+            corners = [
+                list(loc),
+                [loc.x + orig_dims.x, loc.y],
+                [loc.x, loc.y - orig_dims.y],
+                [loc.x + orig_dims.x, loc.y - orig_dims.y],
+            ]
+            extend(corners)
+    return points
+
+
+def get_core_points(frame, nodes) -> list:
+    """Get the points that the unpadded convex hull of a frame is built from.
+    This is the raw corners of every node, the center of every reroute and the outline of every subframe,
+    which can then be offset with offset_convex_hull to get the same shape as the padded points."""
+    points = []
+    extend = points.extend
+    append = points.append
+    for other_frame in frame.subframes:
+        extend(other_frame.shape.verts)
+
+    fac = dpifac()
+    for node in nodes:
+        if node.parent and node.parent in nodes:
+            continue
+        if node.type == "REROUTE":
+            loc = node.location * fac
+            append((loc[0], loc[1]))
+        else:
+            loc = get_node_loc(node) * fac
+            dims = node.dimensions
+            extend((
+                (loc.x, loc.y),
+                (loc.x + dims.x, loc.y),
+                (loc.x, loc.y - dims.y),
+                (loc.x + dims.x, loc.y - dims.y),
+            ))
+    return points
+
+
+def offset_convex_hull(verts: list[V], radius: float, arc_res=12) -> list[V]:
+    """Offset a convex polygon outwards by a disc of the given radius (a minkowski sum).
+    The rounded corners are sampled with at most arc_res points per full turn."""
+    # Remove duplicate consecutive points, as they don't have a defined edge direction
+    verts = [V(v) for i, v in enumerate(verts) if i == 0 or V(v) != V(verts[i - 1])]
+    if len(verts) > 1 and verts[0] == verts[-1]:
+        verts.pop()
+    if not verts:
+        return []
+    if len(verts) == 1:
+        center = verts[0]
+        return [center + V((cos(i / arc_res * tau), sin(i / arc_res * tau))) * radius for i in range(arc_res)]
+
+    length = len(verts)
+    # The sign of the area tells us the winding order, and so which side of the edges is outside.
+    area = sum(verts[i - 1].cross(verts[i]) for i in range(length))
+    sign = -1 if area < 0 else 1
+
+    # The angle of the outward normal of the edge going from each vertex to the next one
+    angles = []
+    for i, v in enumerate(verts):
+        edge = verts[(i + 1) % length] - v
+        angles.append(atan2(-edge.x * sign, edge.y * sign))
+
+    step = tau / arc_res
+    offset = []
+    append = offset.append
+    for i, v in enumerate(verts):
+        start = angles[i - 1]
+        # The exterior angle at this corner, which is the arc that the disc sweeps around it.
+        sweep = ((angles[i] - start) * sign) % tau
+        res = max(1, ceil(sweep / step))
+        for j in range(res + 1):
+            angle = start + sweep * j / res * sign
+            append(V((v.x + cos(angle) * radius, v.y + sin(angle) * radius)))
+    return offset
+
+
+def build_frame_shape(frame, nodes, mode="POINTS", offset=20, reroute_res=12, tolerance=0.0) -> tuple[Polygon, V]:
+    """Build the outline of a frame from its nodes and subframes, and return it along with the frame center.
+    The "POINTS" mode pads every node with extra points before finding the convex hull,
+    while "MINKOWSKI" finds the hull of the raw nodes, and then offsets it analytically."""
+    if mode == "MINKOWSKI":
+        points = get_core_points(frame, nodes)
+        core = hull_from_points(points, tolerance=tolerance)
+        shape = Polygon(offset_convex_hull(core.verts, offset, arc_res=reroute_res))
+    else:
+        points = get_hull_points(frame, nodes, offset=offset, reroute_res=reroute_res)
+        shape = hull_from_points(points, tolerance=tolerance)
+    center = V(np.mean(np.array(points), axis=0))
+    return shape, center
+
+
+def hull_from_points(points, tolerance=0.0) -> Polygon:
+    """Create the convex hull of a list of points.
+    If a tolerance is given, vertices that deviate from a straight outline by less than it are removed."""
+    indeces = convex_hull_2d(points)
+    shape = Polygon([points[i] for i in indeces])
+    if tolerance > 0:
+        shape = shape.simplified(tolerance)
+    return shape
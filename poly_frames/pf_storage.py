@@ -0,0 +1,167 @@
+"""Packed storage for the arrays that frames keep in ID properties.
+Generic ID property arrays are saved and converted element by element, and lists of vectors are stored as a group
+of separate arrays, so instead each array is packed into a single bytes ID property that starts with a small header,
+and can be read straight into numpy with np.frombuffer.
+
+Layout (little endian):
+    magic       2 bytes     b"PF"
+    version     uint8       FORMAT_VERSION
+    dtype       uint8       index into DTYPES
+    width       uint16      values per item, e.g. 2 for points
+    count       uint32      number of items
+    data        count * width values
+
+Shapes can also be quantised (the int16 dtype), in which case the header is followed by the center of the shape
+and the distance between quantised values as 3 float32s, and the data is the int16 offsets of the points from
+the center. That roughly halves the size of the data, and the error is at most half of the step, which is kept well
+below one node editor unit. Shapes that are too large to be stored that precisely fall back to float32.
+Packing and unpacking quantised shapes is several times slower than float32 though, and every read has to build
+a new array rather than viewing the bytes, so it's off by default (see benchmarks/shape_quantisation.py).
+Quantised shapes can always be read, so it can be turned on when a smaller .blend file matters more.
+
+Older files store these as ID property lists. They can still be read, and are converted by migrate_frame,
+which is run for every tree when a file is loaded.
+
+Frames also used to store the locations and dimensions of all of their nodes, to check whether they had moved.
+Now they only store a fingerprint of them (see fingerprint()), so migrate_frame removes the old lists."""
+import struct
+import numpy as np
+from hashlib import blake2b
+
+MAGIC = b"PF"
+# Version 2 added quantised shapes
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<2sBBHI")
+QUANTISED_HEADER = struct.Struct("<3f")
+DTYPES = [np.dtype("<f4"), np.dtype("<i4"), np.dtype("<i2")]
+QUANTISED = 2
+INT16_MAX = 32767
+# The largest and smallest distances between quantised values, in node editor units
+MAX_STEP = 1 / 8
+MIN_STEP = 1 / 1024
+
+# The ID properties of a frame that are packed, and the dtype and width of their items
+PACKED_KEYS = {
+    "_node_uids": ("<i4", 1),
+    "_subframes": ("<i4", 1),
+    "_shape": ("<f4", 2),
+    "_shape_region": ("<f4", 2),
+}
+
+# Properties that older versions stored, and that are no longer used
+OBSOLETE_KEYS = ("_locations", "_dimensions")
+
+# The properties that hold points that can be quantised. _shape_region isn't, because it's set for every visible
+# frame on every redraw, and is only used for hit testing in region space, so it's faster to store it as floats.
+SHAPE_KEYS = {"_shape"}
+
+# Set this to False to write ID property lists like older versions did, to compare the two formats.
+use_packed = True
+# Set this to True to store shapes as int16 offsets from their center rather than float32
+quantise_shapes = False
+
+
+def pack(values, dtype="<f4", width=1) -> bytes:
+    """Pack a sequence of values, or of items with `width` values each, into bytes"""
+    dtype = np.dtype(dtype)
+    array = np.asarray(values, dtype=dtype).reshape(-1, width)
+    return HEADER.pack(MAGIC, FORMAT_VERSION, DTYPES.index(dtype), width, len(array)) + array.tobytes()
+
+
+def pack_points(points) -> bytes:
+    """Pack 2D points, quantising them if quantise_shapes is enabled and they fit with enough precision"""
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+    if not quantise_shapes or not len(points):
+        return pack(points, "<f4", 2)
+
+    low = points.min(axis=0)
+    high = points.max(axis=0)
+    center = (low + high) / 2
+    # Use the step that will be read back, so that rounding it doesn't add to the error
+    step = float(np.float32(max(float((high - low).max()) / 2 / INT16_MAX, MIN_STEP)))
+    if step > MAX_STEP:
+        return pack(points, "<f4", 2)
+
+    offsets = np.clip(np.rint((points - center) / step), -INT16_MAX, INT16_MAX).astype("<i2")
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, QUANTISED, 2, len(points))
+    return header + QUANTISED_HEADER.pack(center[0], center[1], step) + offsets.tobytes()
+
+
+def is_packed(value) -> bool:
+    return isinstance(value, bytes) and value[:2] == MAGIC
+
+
+def unpack(data: bytes) -> np.ndarray:
+    """Get a read only view of the packed values without copying them (apart from quantised shapes).
+    Items with a width of 1 are returned as a flat array, and others as an array of shape (count, width)."""
+    magic, version, dtype_index, width, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version > FORMAT_VERSION:
+        raise ValueError(f"Unsupported poly frames data (version {version})")
+    if dtype_index == QUANTISED:
+        x, y, step = QUANTISED_HEADER.unpack_from(data, HEADER.size)
+        offset = HEADER.size + QUANTISED_HEADER.size
+        offsets = np.frombuffer(memoryview(data), dtype=DTYPES[QUANTISED], count=count * width, offset=offset)
+        # This has to make a new array, unlike the other types
+        return offsets.reshape(count, width) * np.float32(step) + np.array((x, y), dtype=np.float32)
+
+    array = np.frombuffer(memoryview(data), dtype=DTYPES[dtype_index], count=count * width, offset=HEADER.size)
+    return array if width == 1 else array.reshape(count, width)
+
+
+def read_array(owner, key: str, dtype="<f4", width=1) -> np.ndarray:
+    """Read an array from an ID property in either the packed or the old format"""
+    value = owner.get(key)
+    if value is None:
+        return np.zeros(0 if width == 1 else (0, width), dtype=dtype)
+    if isinstance(value, bytes):
+        return unpack(value)
+    array = np.array(value, dtype=dtype)
+    return array if width == 1 else array.reshape(-1, width)
+
+
+def write_array(owner, key: str, values, dtype="<f4", width=1):
+    if use_packed:
+        owner[key] = pack(values, dtype, width)
+    else:
+        array = np.asarray(values, dtype=dtype)
+        owner[key] = array.tolist() if width == 1 else array.reshape(-1, width).tolist()
+
+
+def write_points(owner, key: str, points):
+    """Write the points of a shape, which are quantised unlike write_array"""
+    if use_packed:
+        owner[key] = pack_points(points)
+    else:
+        write_array(owner, key, points, "<f4", 2)
+
+
+def fingerprint(rows: np.ndarray) -> bytes:
+    """Get a short hash of an array of rows, e.g. the locations and dimensions of some nodes.
+    The rows are sorted first, so the order of the nodes in the tree doesn't matter (selecting a node moves it to the
+    end), and two nodes swapping places with the same dimensions doesn't change how the frame looks anyway."""
+    rows = np.ascontiguousarray(rows, dtype="<f4")
+    if rows.ndim == 2 and len(rows) > 1:
+        rows = rows[np.lexsort(rows.T[::-1])]
+    return blake2b(rows.tobytes(), digest_size=8).digest()
+
+
+def migrate_frame(frame) -> int:
+    """Convert the ID properties of a frame from the old format to the packed one, and remove the ones that are no
+    longer used. Returns how many were converted or removed."""
+    converted = 0
+    for key in OBSOLETE_KEYS:
+        if key in frame:
+            del frame[key]
+            converted += 1
+    if not use_packed:
+        return converted
+    for key, (dtype, width) in PACKED_KEYS.items():
+        value = frame.get(key)
+        if value is not None and not isinstance(value, bytes):
+            array = read_array(frame, key, dtype, width)
+            if key in SHAPE_KEYS:
+                write_points(frame, key, array)
+            else:
+                write_array(frame, key, array, dtype, width)
+            converted += 1
+    return converted
@@ -1,4 +1,8 @@
 from bpy.types import Panel, UILayout, NODE_MT_context_menu
+from .draw_handlers import timer
+from .pf_recorder import recorder
+from ..shared.functions import get_prefs
+from ..shared.tracing import tracer
 
 
 class POLY_FRAMES_PT_node_panel(Panel):
@@ -26,6 +30,50 @@ class POLY_FRAMES_PT_node_panel(Panel):
         col.prop(active, "label_offset")
 
 
+class POLY_FRAMES_PT_performance(Panel):
+    """Shows how long the different parts of drawing the poly frames are taking"""
+    bl_space_type = "NODE_EDITOR"
+    bl_region_type = "UI"
+    bl_label = "Poly Frames Performance"
+    bl_category = "Node"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    @classmethod
+    def poll(self, context):
+        return context.space_data.node_tree is not None
+
+    def draw(self, context):
+        layout: UILayout = self.layout
+        layout.prop(get_prefs(context), "record_timings")
+        if tracer.enabled:
+            text = f"Stop and save trace ({len(tracer.events)} spans)"
+        else:
+            text = "Start trace"
+        layout.operator("node.toggle_poly_frames_trace", text=text, icon="REC", depress=tracer.enabled)
+        if recorder.enabled:
+            text = f"Stop and save recording ({len(recorder.events)} events)"
+        else:
+            text = "Record interactions"
+        layout.operator("node.toggle_poly_frames_recording", text=text, icon="REC", depress=recorder.enabled)
+
+        stats = timer.stats()
+        if not stats:
+            layout.label(text="No timings recorded")
+            return
+
+        col = layout.column(align=True)
+        row = col.row(align=True)
+        for heading in ("Section", "p50", "p95", "p99"):
+            row.label(text=heading)
+        for name, section in stats.items():
+            row = col.row(align=True)
+            row.label(text=name)
+            for key in ("p50", "p95", "p99"):
+                row.label(text=f"{section[key]:.2f}")
+        layout.label(text="Times are in milliseconds")
+        layout.operator("node.reset_poly_frames_timings")
+
+
 def draw_context_menu(self, context):
     layout = self.layout
     # TODO: Separate functions into their own operators and add to the context menu (aka right click menu)
@@ -0,0 +1,322 @@
+"""Compute frame shapes on worker threads.
+Reading nodes has to happen on the main thread, so the geometry of a frame is first copied into numpy arrays
+(a snapshot), and then the hull, offset and bounds are computed from those arrays on a thread pool.
+Finished results are swapped into the frames by the draw callback on the next redraw."""
+import os
+import bpy
+import numpy as np
+from math import tau
+from typing import Optional
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, Future
+from .pf_redraw import redraws
+from ..shared.functions import get_node_loc
+from ..shared.helpers import dpifac
+
+
+@dataclass
+class FrameSnapshot():
+    """A copy of all of the geometry needed to build the shape of a frame"""
+
+    frame_id: int
+    # (x, y, width, height) of every node, where x, y is the top left corner
+    rects: np.ndarray
+    # The location of every reroute
+    reroutes: np.ndarray
+    # The outline of every subframe
+    subframes: list[np.ndarray]
+    mode: str = "POINTS"
+    offset: float = 20
+    reroute_res: int = 12
+    tolerance: float = 0.0
+    key: int = field(init=False)
+
+    def __post_init__(self):
+        # Used to tell whether a finished result still matches the current state of the frame
+        self.key = hash((
+            self.rects.tobytes(),
+            self.reroutes.tobytes(),
+            tuple(s.tobytes() for s in self.subframes),
+            self.mode,
+            self.offset,
+            self.reroute_res,
+            self.tolerance,
+        ))
+
+
+@dataclass
+class ShapeResult():
+    frame_id: int
+    key: int
+    verts: np.ndarray
+    center: np.ndarray
+    bounds: tuple[np.ndarray, np.ndarray]
+
+
+# Returned by ShapeWorkers.request when computing the shape raised an error, in which case the old shape is kept
+FAILED = object()
+
+
+def snapshot_frame(frame, nodes, mode="POINTS", offset=20, reroute_res=12, tolerance=0.0) -> FrameSnapshot:
+    """Copy the geometry of a frame into arrays. This needs to be run on the main thread."""
+    fac = dpifac()
+    rects = []
+    reroutes = []
+    for node in nodes:
+        if node.parent and node.parent in nodes:
+            continue
+        if node.type == "REROUTE":
+            reroutes.append(node.location * fac)
+        else:
+            loc = get_node_loc(node) * fac
+            dims = node.dimensions
+            rects.append((loc.x, loc.y, dims.x, dims.y))
+
+    subframes = [np.array(f.shape.verts, dtype=np.float64).reshape(-1, 2) for f in frame.subframes]
+    return FrameSnapshot(
+        frame_id=frame.frame_id,
+        rects=np.array(rects, dtype=np.float64).reshape(-1, 4),
+        reroutes=np.array(reroutes, dtype=np.float64).reshape(-1, 2),
+        subframes=[s for s in subframes if len(s)],
+        mode=mode,
+        offset=offset,
+        reroute_res=reroute_res,
+        tolerance=tolerance,
+    )
+
+
+# Numpy kernels. These don't touch bpy so they are safe to run on any thread, and most of their time is spent in
+# numpy operations over whole arrays, which release the GIL.
+#################################################
+
+
+def vertex_normals(verts: np.ndarray) -> np.ndarray:
+    """The same as Polygon.normals(), the normalised sum of the directions from the neighbouring vertices"""
+
+    def normalize(vecs):
+        lengths = np.linalg.norm(vecs, axis=1, keepdims=True)
+        return np.divide(vecs, lengths, out=np.zeros_like(vecs), where=lengths != 0)
+
+    from_prev = normalize(verts - np.roll(verts, 1, axis=0))
+    from_next = normalize(verts - np.roll(verts, -1, axis=0))
+    return normalize(from_prev + from_next)
+
+
+def circle(radius: float, res: int) -> np.ndarray:
+    angles = np.arange(res) / res * tau
+    return np.stack((np.sin(angles), np.cos(angles)), axis=1) * radius
+
+
+def padded_points(snapshot: FrameSnapshot) -> np.ndarray:
+    """The equivalent of pf_shapes.get_hull_points"""
+    offset = snapshot.offset
+    x, y, w, h = snapshot.rects.T
+    corners = np.stack((
+        np.stack((x - offset, y + offset), axis=1),
+        np.stack((x + w + offset, y + offset), axis=1),
+        np.stack((x - offset, y - h - offset), axis=1),
+        np.stack((x + w + offset, y - h - offset), axis=1),
+    ), axis=1).reshape(-1, 2)
+    reroutes = (snapshot.reroutes[:, None, :] + circle(offset * 2, snapshot.reroute_res)).reshape(-1, 2)
+    subframes = [s + vertex_normals(s) * offset for s in snapshot.subframes]
+    return np.concatenate([corners, reroutes] + subframes)
+
+
+def core_points(snapshot: FrameSnapshot) -> np.ndarray:
+    """The equivalent of pf_shapes.get_core_points"""
+    x, y, w, h = snapshot.rects.T
+    corners = np.stack((
+        np.stack((x, y), axis=1),
+        np.stack((x + w, y), axis=1),
+        np.stack((x, y - h), axis=1),
+        np.stack((x + w, y - h), axis=1),
+    ), axis=1).reshape(-1, 2)
+    return np.concatenate([corners, snapshot.reroutes] + snapshot.subframes)
+
+
+def convex_hull(points: np.ndarray) -> np.ndarray:
+    """Get the convex hull of a set of points in counter clockwise order, starting from the leftmost point.
+    This uses quickhull, so each step is a numpy operation over all of the remaining candidate points,
+    and the python loop only runs once per hull edge rather than once per point."""
+    points = np.unique(points, axis=0)  # This also sorts them by x and then y
+    if len(points) < 3:
+        return points
+
+    hull = []
+    # Each item is an edge of the hull so far, and the points that could be outside of it.
+    # The edge along the bottom is processed first, so the vertices are found in counter clockwise order.
+    stack = [(points[-1], points[0], points), (points[0], points[-1], points)]
+    while stack:
+        a, b, candidates = stack.pop()
+        # Negative values are to the right of the edge, which is outside of a counter clockwise hull
+        cross = (b[0] - a[0]) * (candidates[:, 1] - a[1]) - (b[1] - a[1]) * (candidates[:, 0] - a[0])
+        outside = cross < 0
+        if not outside.any():
+            hull.append(a)
+            continue
+        candidates = candidates[outside]
+        furthest = candidates[np.argmin(cross[outside])]
+        stack.append((furthest, b, candidates))
+        stack.append((a, furthest, candidates))
+    return np.array(hull)
+
+
+def simplify(verts: np.ndarray, tolerance: float) -> np.ndarray:
+    """The equivalent of Polygon.simplified.
+    Rather than splitting one chain at a time, every chain is split at its furthest vertex at once,
+    so the python loop only runs once per level of the Douglas-Peucker recursion."""
+    length = len(verts)
+    if length <= 3 or tolerance <= 0:
+        return verts
+    split = int(np.argmax(np.linalg.norm(verts - verts[0], axis=1)))
+    keep = np.zeros(length, dtype=bool)
+    keep[[0, split]] = True
+    # The last chain ends back at the first vertex
+    closed = np.concatenate((verts, verts[:1]))
+    indices = np.arange(length)
+    while True:
+        kept = np.flatnonzero(keep)
+        ends = np.append(kept, length)
+        # The chain that each vertex is in, and the vectors from its start to its end and to the vertex
+        chain = np.searchsorted(kept, indices, side="right") - 1
+        starts = closed[ends[chain]]
+        edges = closed[ends[chain + 1]] - starts
+        to_verts = verts - starts
+        edge_lens = np.hypot(edges[:, 0], edges[:, 1])
+        cross = np.abs(edges[:, 0] * to_verts[:, 1] - edges[:, 1] * to_verts[:, 0])
+        # Perpendicular distance from the line between the ends of the chain
+        dists = np.where(
+            edge_lens > 0,
+            cross / np.where(edge_lens > 0, edge_lens, 1),
+            np.hypot(to_verts[:, 0], to_verts[:, 1]),
+        )
+        dists[keep] = 0
+
+        chain_max = np.maximum.reduceat(dists, kept)[chain]
+        split = np.flatnonzero((dists == chain_max) & (chain_max > tolerance))
+        if not len(split):
+            break
+        # Only split each chain at its first furthest vertex, the same as Polygon.simplified
+        _, first = np.unique(chain[split], return_index=True)
+        keep[split[first]] = True
+    return verts[keep] if keep.sum() >= 3 else verts
+
+
+def offset_hull(hull: np.ndarray, radius: float, arc_res=12) -> np.ndarray:
+    """The equivalent of pf_shapes.offset_convex_hull, for a counter clockwise hull"""
+    if len(hull) == 1:
+        return hull[0] + circle(radius, arc_res)
+    edges = np.roll(hull, -1, axis=0) - hull
+    # The angle of the outward normal of each edge
+    angles = np.arctan2(-edges[:, 0], edges[:, 1])
+    starts = np.roll(angles, 1)
+    sweeps = (angles - starts) % tau
+    res = np.maximum(1, np.ceil(sweeps / (tau / arc_res)).astype(int))
+    # Every arc has res + 1 points. Work out which corner each point belongs to, and its index along the arc.
+    counts = res + 1
+    corner = np.repeat(np.arange(len(hull)), counts)
+    steps = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    arc = starts[corner] + sweeps[corner] * steps / res[corner]
+    return hull[corner] + np.stack((np.cos(arc), np.sin(arc)), axis=1) * radius
+
+
+def compute_shape(snapshot: FrameSnapshot) -> ShapeResult:
+    """Build the shape of a frame from a snapshot. This is the same as pf_shapes.build_frame_shape."""
+    if not len(snapshot.rects) and not len(snapshot.reroutes) and not snapshot.subframes:
+        # The frame is empty, and will be removed the next time it is checked
+        zero = np.zeros(2)
+        return ShapeResult(snapshot.frame_id, snapshot.key, np.empty((0, 2)), zero, (zero, zero))
+    if snapshot.mode == "MINKOWSKI":
+        points = core_points(snapshot)
+        hull = simplify(convex_hull(points), snapshot.tolerance)
+        verts = offset_hull(hull, snapshot.offset, snapshot.reroute_res)
+    else:
+        points = padded_points(snapshot)
+        verts = simplify(convex_hull(points), snapshot.tolerance)
+    return ShapeResult(
+        frame_id=snapshot.frame_id,
+        key=snapshot.key,
+        verts=verts,
+        center=points.mean(axis=0),
+        bounds=(verts.min(axis=0), verts.max(axis=0)),
+    )
+
+
+# Thread pool
+#################################################
+
+
+@dataclass
+class Job():
+    key: int
+    future: Future
+
+
+class ShapeWorkers():
+    """Keeps track of the shapes being computed on the thread pool, with at most one job per frame."""
+
+    __slots__ = ["executor", "jobs", "max_workers"]
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.executor = None
+        self.jobs: dict[tuple[int, int], Job] = {}
+
+    def request(self, node_tree, snapshot: FrameSnapshot):
+        """Get the finished shape for this snapshot, or start computing it and return None if it isn't ready.
+        If computing the shape raised an error, FAILED is returned instead.
+        If the frame has changed since an earlier request, the old result is thrown away."""
+        key = (node_tree.as_pointer(), snapshot.frame_id)
+        job = self.jobs.get(key)
+        if job and job.key == snapshot.key:
+            if not job.future.done():
+                return None
+            del self.jobs[key]
+            try:
+                return job.future.result()
+            except Exception as e:
+                print(f"Poly frames: Couldn't build the shape of frame {snapshot.frame_id}: {e!r}")
+                return FAILED
+
+        if job:
+            job.future.cancel()
+        if not self.executor:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="poly_frames")
+        self.jobs[key] = Job(snapshot.key, self.executor.submit(compute_shape, snapshot))
+        if not bpy.app.timers.is_registered(poll_jobs):
+            bpy.app.timers.register(poll_jobs, first_interval=0.01)
+        return None
+
+    @property
+    def in_flight(self) -> int:
+        return sum(not job.future.done() for job in self.jobs.values())
+
+    def clear(self):
+        for job in self.jobs.values():
+            job.future.cancel()
+        self.jobs.clear()
+
+    def shutdown(self):
+        self.clear()
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+
+workers = ShapeWorkers()
+
+
+def poll_jobs():
+    """Redraw the node editors that show the trees whose results are ready, so that they can be swapped in"""
+    for (pointer, _), job in workers.jobs.items():
+        if job.future.done():
+            redraws.tag_tree_pointer(pointer)
+    if workers.in_flight:
+        return 0.01
+    return None
+
+
+def unregister():
+    if bpy.app.timers.is_registered(poll_jobs):
+        bpy.app.timers.unregister(poll_jobs)
+    workers.shutdown()
@@ -1,9 +1,14 @@
+import os
 import bpy
+import json
 import typing
 import inspect
 import pkgutil
 import importlib
 from pathlib import Path
+from hashlib import sha1
+from typing import Optional
+from time import perf_counter
 from . import icons
 
 __all__ = (
@@ -14,11 +19,23 @@ __all__ = (
 
 blender_version = bpy.app.version
 
+ROOT = Path(__file__).parent.parent
+# The order of the classes to register, and the modules that need importing, are cached in this file,
+# so that they don't need to be worked out again until one of the addon's files changes.
+# Set AUTO_LOAD_MANIFEST=0 in the environment to always work them out from scratch.
+MANIFEST_PATH = Path(__file__).parent / "__pycache__" / "auto_load_manifest.json"
+MANIFEST_VERSION = 1
+use_manifest = os.environ.get("AUTO_LOAD_MANIFEST", "1") != "0"
+
 # Icons needs to register first so that they are available to other modules when they're imported
 manual_modules_pre_classes = [icons]
 manual_modules_post_classes = []
 modules = None
 ordered_classes = None
+# The names of all of the modules in the addon, relative to the root package
+module_names = None
+# How long init() took, and whether the manifest was used ("hit", "miss" or "off")
+stats = {}
 
 
 def init():
@@ -29,9 +46,36 @@ def init():
 
     global modules
     global ordered_classes
+    global module_names
+
+    start = perf_counter()
+    files = dict(iter_source_files(ROOT))
+    module_names = sorted(name for name in files if not name.endswith(".__init__"))
+    manifest = load_manifest(files) if use_manifest else None
+
+    if manifest:
+        try:
+            modules = [importlib.import_module("." + name, ROOT.name) for name in manifest["modules"]]
+            ordered_classes = [get_manifest_class(module, name) for module, name in manifest["classes"]]
+            ordered_classes = [cls for cls in ordered_classes if not getattr(cls, "is_registered", False)]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            # The manifest doesn't match the code somehow, so do it properly
+            manifest = None
+
+    if not manifest:
+        modules = get_all_submodules(ROOT)
+        ordered_classes = get_ordered_classes_to_register(modules)
+        if use_manifest:
+            save_manifest(files, modules, ordered_classes)
+
+    stats["init"] = perf_counter() - start
+    stats["manifest"] = ("hit" if manifest else "miss") if use_manifest else "off"
 
-    modules = get_all_submodules(Path(__file__).parent.parent)
-    ordered_classes = get_ordered_classes_to_register(modules)
+
+def get_prefs_module_names() -> list[str]:
+    """Get the modules that define the preferences of the sub addons. These need to end with '_prefs'"""
+    names = module_names if module_names is not None else sorted(iter_submodule_names(ROOT))
+    return [name for name in names if name.count(".") == 1 and name.endswith("_prefs")]
 
 
 def register():
@@ -88,6 +132,114 @@ def iter_submodule_names(path, root=""):
             yield root + module_name
 
 
+# Manifest
+#################################################
+
+
+def iter_source_files(path, root=""):
+    """Yield the name and path of every module in the addon, including the __init__ files of packages"""
+    for _, module_name, is_package in pkgutil.iter_modules([str(path)]):
+        if is_package:
+            yield root + module_name + ".__init__", path / module_name / "__init__.py"
+            yield from iter_source_files(path / module_name, root + module_name + ".")
+        else:
+            yield root + module_name, path / (module_name + ".py")
+
+
+def hash_file(path: Path) -> str:
+    try:
+        return sha1(path.read_bytes()).hexdigest()
+    except OSError:
+        return ""
+
+
+def get_file_key(path: Path) -> list:
+    try:
+        stat = path.stat()
+    except OSError:
+        return [0, 0]
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_manifest(files: dict[str, Path]) -> Optional[dict]:
+    """Load the manifest if none of the files have changed since it was written.
+    Files with a different modified time are hashed, so that just touching a file doesn't invalidate it."""
+    try:
+        manifest = json.loads(MANIFEST_PATH.read_text())
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("blender") != list(blender_version):
+        return None
+    recorded = manifest.get("files", {})
+    if set(recorded) != set(files):
+        return None
+
+    touched = False
+    for name, path in files.items():
+        key = get_file_key(path)
+        if recorded[name][:2] == key:
+            continue
+        if hash_file(path) != recorded[name][2]:
+            return None
+        recorded[name] = key + [recorded[name][2]]
+        touched = True
+
+    if touched:
+        # Remember the new times, so that the files don't need hashing again next time
+        write_manifest(manifest)
+    return manifest
+
+
+def save_manifest(files: dict[str, Path], modules, ordered_classes):
+    """Record which modules need importing and the order to register the classes in.
+    Modules that don't register anything are left out, so they are only imported if another module needs them."""
+    prefix = ROOT.name + "."
+    # Classes are found again by the name that they have in a module, as some are created by decorators
+    locations = {}
+    for module in modules:
+        for name, value in module.__dict__.items():
+            if inspect.isclass(value) and (value not in locations or value.__module__ == module.__name__):
+                locations[value] = [module.__name__[len(prefix):], name]
+    if any(cls not in locations for cls in ordered_classes):
+        return
+    classes = [locations[cls] for cls in ordered_classes]
+
+    class_modules = {module for module, _ in classes}
+    needed = []
+    for module in modules:
+        name = module.__name__[len(prefix):]
+        if name in class_modules or hasattr(module, "register") or hasattr(module, "unregister"):
+            needed.append(name)
+
+    write_manifest({
+        "version": MANIFEST_VERSION,
+        "blender": list(blender_version),
+        "files": {name: get_file_key(path) + [hash_file(path)] for name, path in files.items()},
+        "modules": needed,
+        "deferred": sorted(set(module_names) - set(needed)),
+        "classes": classes,
+    })
+
+
+def write_manifest(manifest: dict):
+    # The addon folder can be read only, in which case everything is just worked out each time.
+    try:
+        MANIFEST_PATH.parent.mkdir(exist_ok=True)
+        temp_path = MANIFEST_PATH.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(manifest, indent=1))
+        temp_path.replace(MANIFEST_PATH)
+    except OSError:
+        pass
+
+
+def get_manifest_class(module_name: str, name: str):
+    value = getattr(importlib.import_module("." + module_name, ROOT.name), name)
+    if not inspect.isclass(value):
+        raise TypeError(f"{module_name}.{name} is not a class")
+    return value
+
+
 # Find classes to register
 #################################################
 
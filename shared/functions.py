@@ -1,61 +1,30 @@
 from __future__ import annotations
+import bpy
 import gpu
 
-from pathlib import Path
 from gpu.types import GPUBatch
 from typing import TYPE_CHECKING
 from mathutils import Vector as V
 from bpy.types import Area, Event, KeyMapItem
 from gpu_extras.batch import batch_for_shader
 from .helpers import Rectangle, vec_divide, vec_min, vec_max
+from .shaders import shaders
 
 if TYPE_CHECKING:
     from .preferences import NodeExtrasPrefs
 
-sh_2d_uni = gpu.shader.from_builtin('2D_UNIFORM_COLOR')
-sh_2d_uniform_float = sh_2d_uni.uniform_float
-sh_2d_uni_bind = sh_2d_uni.bind
-
-sh_2d_flat = gpu.shader.from_builtin("2D_FLAT_COLOR")
-sh_2d_flat_bind = sh_2d_flat.bind
-
-
-def load_shader(frag_path: Path, vert_path: Path, geom_path: Path = "") -> gpu.types.GPUShader:
-    """Creates a shader from a fragment and vertex glsl file"""
-    paths = [Path(frag_path), Path(vert_path)]
-    if geom_path:
-        paths.append(Path(geom_path))
-    shader_texts = []
-
-    for path in paths:
-        if not path.is_absolute():
-            path = Path(__file__).parents[1] / path
-        with open(path, "r") as f:
-            lines = f.readlines()
-            text = ""
-            for line in lines:
-                if "#version" not in line:
-                    text += line
-            shader_texts.append(text)
-    vert_shader = shader_texts[0]
-    frag_shader = shader_texts[1]
-    if len(shader_texts) == 3:
-        geom_shader = shader_texts[2]
-        return gpu.types.GPUShader(vert_shader, frag_shader, geocode=geom_shader)
-    else:
-        return gpu.types.GPUShader(vert_shader, frag_shader)
-
-
 # graciously stolen from the amazing code_editor addon
 # https://github.com/K-410/blender-scripts/blob/master/2.8/code_editor.py
 def draw_quads_2d(sequence, color):
     """Draw a rectangle from the given coordinates"""
     qseq, = [(x1, y1, y2, x1, y2, x2) for (x1, y1, y2, x2) in (sequence,)]
     uv = [(0, 0, 1, 0, 1, 1) for (x1, y1, y2, x2) in (sequence,)]
-    batch = batch_for_shader(sh_2d_uni, 'TRIS', {'pos': qseq, 'uv': uv})
+    if not (shader := shaders.get("2D_UNIFORM_COLOR")):
+        return
+    batch = batch_for_shader(shader, 'TRIS', {'pos': qseq, 'uv': uv})
     gpu.state.blend_set('ALPHA')
-    sh_2d_uni("color", [*color])
-    batch.draw(sh_2d_uni)
+    shader.uniform_float("color", [*color])
+    batch.draw(shader)
 
 
 # def get_batch_from_quads_2d(sequence) -> GPUBatch:
@@ -71,7 +40,9 @@ def draw_quads_2d(sequence, color):
 def get_batch_from_quads_2d(sequence) -> GPUBatch:
     """Return the batch for a rectangle from the given coordinates"""
     qseq, = [(x1, y1, y2, x1, y2, x2) for (x1, y1, y2, x2) in (sequence,)]
-    batch = batch_for_shader(sh_2d_uni, 'TRIS', {'pos': qseq})
+    if not (shader := shaders.get("2D_UNIFORM_COLOR")):
+        return None
+    batch = batch_for_shader(shader, 'TRIS', {'pos': qseq})
     return batch
 
 
@@ -91,10 +62,12 @@ def get_batch_from_quads_2d(sequence) -> GPUBatch:
 
 def draw_quads_2d_batch(batch, color):
     """Draw a rectangle batch with the given color"""
+    if not batch or not (shader := shaders.get("2D_UNIFORM_COLOR")):
+        return
     gpu.state.blend_set('ALPHA')
-    sh_2d_uni_bind()
-    sh_2d_uniform_float("color", [*color])
-    batch.draw(sh_2d_uni)
+    shader.bind()
+    shader.uniform_float("color", [*color])
+    batch.draw(shader)
 
 
 def draw_lines_from_quad_2d(sequence, color, width=1):
@@ -102,11 +75,13 @@ def draw_lines_from_quad_2d(sequence, color, width=1):
     # top/bottom, left/right
     # drawn in pairs of 2
     qseq, = [(tl, bl, bl, br, br, tr, tr, tl) for (tl, tr, br, bl) in (sequence,)]
-    batch = batch_for_shader(sh_2d_uni, 'LINES', {'pos': qseq})
+    if not (shader := shaders.get("2D_UNIFORM_COLOR")):
+        return
+    batch = batch_for_shader(shader, 'LINES', {'pos': qseq})
     gpu.state.line_width_set(width)
-    sh_2d_uni_bind()
-    sh_2d_uniform_float("color", [*color])
-    batch.draw(sh_2d_uni)
+    shader.bind()
+    shader.uniform_float("color", [*color])
+    batch.draw(shader)
 
 
 def get_batch_lines_from_quads_2d(sequence) -> GPUBatch:
@@ -114,50 +89,62 @@ def get_batch_lines_from_quads_2d(sequence) -> GPUBatch:
     # top/bottom, left/right
     # drawn in pairs of 2
     qseq, = [(tl, bl, bl, br, br, tr, tr, tl) for (tl, tr, br, bl) in (sequence,)]
-    batch = batch_for_shader(sh_2d_uni, 'LINES', {'pos': qseq})
+    if not (shader := shaders.get("2D_UNIFORM_COLOR")):
+        return None
+    batch = batch_for_shader(shader, 'LINES', {'pos': qseq})
     return batch
 
 
 def draw_lines_from_quads_2d_batch(batch, color, width):
     """Draw a rectangle line batch with the given color and width"""
+    if not batch or not (shader := shaders.get("2D_UNIFORM_COLOR")):
+        return
     gpu.state.line_width_set(width)
-    sh_2d_uni_bind()
-    sh_2d_uniform_float("color", [*color])
-    batch.draw(sh_2d_uni)
+    shader.bind()
+    shader.uniform_float("color", [*color])
+    batch.draw(shader)
 
 
 def draw_lines_uniform(coords, color, width=1):
     """Draw lines from the given coords and color"""
+    if not (shader := shaders.get("2D_UNIFORM_COLOR")):
+        return
     gpu.state.line_width_set(width)
-    batch = batch_for_shader(sh_2d_uni, 'LINES', {'pos': coords})
-    sh_2d_uni_bind()
-    sh_2d_uniform_float("color", [*color])
-    batch.draw(sh_2d_uni)
+    batch = batch_for_shader(shader, 'LINES', {'pos': coords})
+    shader.bind()
+    shader.uniform_float("color", [*color])
+    batch.draw(shader)
     gpu.state.line_width_set(1)
 
 
 def draw_lines_flat(coords, colors, width=1):
     """Draw lines from the given coords and color"""
+    if not (shader := shaders.get("2D_FLAT_COLOR")):
+        return
     gpu.state.line_width_set(width)
-    batch = batch_for_shader(sh_2d_flat, 'LINES', {'pos': coords, 'color': colors})
-    sh_2d_flat_bind()
-    batch.draw(sh_2d_flat)
+    batch = batch_for_shader(shader, 'LINES', {'pos': coords, 'color': colors})
+    shader.bind()
+    batch.draw(shader)
     gpu.state.line_width_set(1)
 
 
 def draw_tris_flat(coords, colors):
     """Draw tris from the given coords and color"""
-    batch = batch_for_shader(sh_2d_flat, 'TRIS', {'pos': coords, 'color': colors})
-    sh_2d_flat_bind()
-    batch.draw(sh_2d_flat)
+    if not (shader := shaders.get("2D_FLAT_COLOR")):
+        return
+    batch = batch_for_shader(shader, 'TRIS', {'pos': coords, 'color': colors})
+    shader.bind()
+    batch.draw(shader)
 
 
 def draw_tris_uniform(coords, color):
     """Draw tris from the given coords and color"""
-    batch = batch_for_shader(sh_2d_uni, 'TRIS', {'pos': coords})
-    sh_2d_uni_bind()
-    sh_2d_uniform_float("color", [*color])
-    batch.draw(sh_2d_uni)
+    if not (shader := shaders.get("2D_UNIFORM_COLOR")):
+        return
+    batch = batch_for_shader(shader, 'TRIS', {'pos': coords})
+    shader.bind()
+    shader.uniform_float("color", [*color])
+    batch.draw(shader)
 
 
 def get_node_dims(node) -> V:
@@ -9,6 +9,9 @@ from bpy.types import NodeTree, Area, Operator
 from time import perf_counter
 from typing import List
 from collections import deque, OrderedDict
+from functools import wraps
+from .tracing import tracer
+from .instrumentation import operator_profiler
 
 # Console text colours
 WHITE = '\033[37m'
@@ -322,6 +325,44 @@ class Polygon():
 
         return Polygon(bevelled)
 
+    def simplified(self, tolerance=1.0):
+        """Remove vertices that lie closer than the tolerance to the rest of the outline,
+        using the Douglas-Peucker algorithm on both halves of the closed polygon."""
+        verts = self.verts
+        length = len(verts)
+        if length <= 3 or tolerance <= 0:
+            return Polygon(verts)
+
+        # Split the outline at the vertex furthest from the first one, so that both chains are open.
+        start = verts[0]
+        split = max(range(length), key=lambda i: (verts[i] - start).length)
+        keep = [False] * length
+        keep[0] = keep[split] = True
+        stack = [(0, split), (split, length)]
+        while stack:
+            first, last = stack.pop()
+            a = verts[first]
+            edge = verts[last % length] - a
+            edge_len = edge.length
+            max_dist = 0
+            furthest = -1
+            for i in range(first + 1, last):
+                to_vert = verts[i] - a
+                # Perpendicular distance from the line between the ends of this chain
+                dist = abs(edge.cross(to_vert)) / edge_len if edge_len else to_vert.length
+                if dist > max_dist:
+                    max_dist = dist
+                    furthest = i
+            if max_dist > tolerance:
+                keep[furthest] = True
+                stack.append((first, furthest))
+                stack.append((furthest, last))
+
+        simplified = [v for v, k in zip(verts, keep) if k]
+        if len(simplified) < 3:
+            return Polygon(verts)
+        return Polygon(simplified)
+
     def __str__(self):
         return f"Polygon({self.verts})"
 
@@ -329,6 +370,30 @@ class Polygon():
         return self.__str__()
 
 
+class PolygonView(Polygon):
+    """A read only polygon, so that one instance can be shared by everything that reads the same shape.
+    The verts are a tuple of frozen vectors, so they can't be changed in place either."""
+
+    __slots__ = []
+
+    def __init__(self, verts=()):
+        if isinstance(verts, Polygon):
+            verts = verts.verts
+        self._verts = tuple(V(p).freeze() for p in verts)
+        self.tri_len = 0
+
+    @property
+    def verts(self):
+        return self._verts
+
+    @verts.setter
+    def verts(self, points):
+        raise AttributeError("PolygonView is read only, create a new Polygon instead")
+
+    def __str__(self):
+        return f"PolygonView({list(self.verts)})"
+
+
 @dataclass
 class Op():
     """A decorator for defining blender Operators that helps to cut down on boilerplate code,
@@ -356,6 +421,8 @@ class Op():
         `macro` (bool): Use to check if an operator is a macro.
         `logging` (int | bool): Whether to log when this operator is called.
             Default is to use the class logging variable which can be set with set_logging() and is global.
+        `profile` (bool): Whether to time invoke, execute and modal, and record the results in
+            shared.instrumentation.operator_profiler while it is enabled.
     """
 
     _logging = False
@@ -383,6 +450,7 @@ class Op():
     # The default is to use the class logging setting, unless this has a value other than -1.
     # ik this is the same name as the module, but I don't care.
     logging: int = -1
+    profile: bool = True
 
     def __call__(self, cls):
         """This takes the decorated class and populate's the bl_ attributes with either the supplied values,
@@ -442,11 +510,63 @@ class Op():
                     else:
                         return _self.execute(context)
 
+        # Record the operator methods when tracing is enabled
+        for method in ("invoke", "execute", "modal"):
+            if func := getattr(Wrapped, method, None):
+                setattr(Wrapped, method, wrap_operator_method(func, f"{idname}.{method}", self.profile))
+
         Wrapped.__doc__ = description
         Wrapped.__name__ = cls.__name__
         return Wrapped
 
 
+# Functions called with (name, operator, context, event) before every invoke or modal call of an Op operator,
+# where name is "idname.method". This is used to record interactions so that they can be replayed.
+operator_event_listeners = []
+
+
+def wrap_operator_method(func, name: str, profile=True):
+    """Wrap invoke, execute or modal so that each call is recorded as a span by the tracer,
+    and timed by the operator profiler if `profile` is True.
+    Blender checks how many arguments operator methods take when they are registered,
+    so the wrapper needs to have the same signature as the original method."""
+
+    def call(self, context, event=None):
+        args = (context, ) if event is None else (context, event)
+        if event is not None and operator_event_listeners:
+            for listener in operator_event_listeners:
+                listener(name, self, context, event)
+        tracing = tracer.enabled
+        profiling = profile and operator_profiler.enabled
+        if not tracing and not profiling:
+            return func(self, *args)
+
+        if tracing:
+            tracer.begin(name, {"event": f"{event.type} {event.value}"} if event else None)
+        status = "ERROR"
+        start = perf_counter()
+        try:
+            result = func(self, *args)
+            status = "|".join(sorted(result)) if isinstance(result, (set, frozenset)) else str(result)
+            return result
+        finally:
+            if profiling:
+                operator_profiler.record(name, status, perf_counter() - start)
+            if tracing:
+                tracer.end(name)
+
+    if func.__code__.co_argcount == 2:
+
+        def wrapper(self, context):
+            return call(self, context)
+    else:
+
+        def wrapper(self, context, event):
+            return call(self, context, event)
+
+    return wraps(func)(wrapper)
+
+
 def lerp(fac, a, b) -> float:
     """Linear interpolation (mix) between two values"""
     return (fac * b) + ((1 - fac) * a)
@@ -512,15 +632,15 @@ def get_uid(other_uids):
 
 def get_active_tree(context, area=None) -> NodeTree:
     """Get nodes from currently edited tree.
-    If user is editing a group, space_data.node_tree is still the base level (outside group).
-    context.active_node is in the group though, so if space_data.node_tree.nodes.active is not
-    the same as context.active_node, the user is in a group.
+    If user is editing a group, space_data.node_tree is still the base level (outside group),
+    but space_data.edit_tree is the group. If there's no edit_tree, context.active_node is in the group though,
+    so if space_data.node_tree.nodes.active is not the same as context.active_node, the user is in a group.
     source: node_wrangler.py"""
 
-    if not area:
-        tree = context.space_data.node_tree
-    else:
-        tree = area.spaces[0].node_tree
+    space = context.space_data if not area else area.spaces[0]
+    if edit_tree := getattr(space, "edit_tree", None):
+        return edit_tree
+    tree = space.node_tree
 
     if tree.nodes.active:
         # Check recursively until we find the real active node_tree
@@ -0,0 +1,220 @@
+from array import array
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Optional
+from .tracing import Tracer
+
+
+class LatencyBuffer():
+    """A fixed size ring buffer of timings in seconds"""
+
+    __slots__ = ["values", "index", "count"]
+
+    def __init__(self, size=256):
+        self.values = array("d", [0.0]) * size
+        self.index = 0
+        self.count = 0
+
+    def append(self, value: float):
+        values = self.values
+        values[self.index] = value
+        self.index = (self.index + 1) % len(values)
+        self.count += 1
+
+    def recent(self) -> list[float]:
+        """The values currently in the buffer, in no particular order"""
+        return self.values[:min(self.count, len(self.values))].tolist()
+
+
+class Instrumentation():
+    """Records the time taken by named sections of code into fixed size ring buffers.
+    This is designed to be left in hot code paths such as draw callbacks: when it is disabled, start and stop
+    return immediately, and when it is enabled they only do a dictionary lookup and an array write.
+    Nothing is sorted or printed until the statistics are asked for.
+    If a tracer is given, every section is also recorded as a span while that tracer is enabled."""
+
+    __slots__ = ["enabled", "size", "buffers", "start_times", "tracer"]
+
+    def __init__(self, size=256, enabled=False, tracer: Optional[Tracer] = None):
+        self.enabled = enabled
+        self.size = size
+        self.tracer = tracer
+        self.buffers: dict[str, LatencyBuffer] = {}
+        self.start_times: dict[str, float] = {}
+
+    def start(self, name: str, tags: Optional[Callable[[], dict]] = None):
+        """Set the start time for this section.
+        `tags` is an optional function that returns a dict of tags, which is only called when the tracer is enabled,
+        so that sections that are started on every redraw don't build tags that are thrown away."""
+        if self.tracer and self.tracer.enabled:
+            self.tracer.begin(name, tags() if tags else None)
+        if not self.enabled:
+            return
+        self.start_times[name] = perf_counter()
+
+    def stop(self, name: str):
+        """Record the time since the section was started"""
+        if self.tracer and self.tracer.enabled:
+            self.tracer.end(name)
+        if not self.enabled:
+            return
+        start = self.start_times.pop(name, None)
+        if start is None:
+            return
+        self.record(name, perf_counter() - start)
+
+    def record(self, name: str, duration: float):
+        """Add a timing for this section directly, in seconds"""
+        buffer = self.buffers.get(name)
+        if buffer is None:
+            buffer = self.buffers[name] = LatencyBuffer(self.size)
+        buffer.append(duration)
+
+    def get_time(self, name: str) -> float:
+        """Get the mean of the recent timings of this section, or 0 if there aren't any"""
+        buffer = self.buffers.get(name)
+        if not buffer or not buffer.count:
+            return 0.0
+        values = buffer.recent()
+        return sum(values) / len(values)
+
+    def percentiles(self, name: str, percentiles=(50, 95, 99)) -> dict[int, float]:
+        """Get the given percentiles of the recent timings of this section, in seconds"""
+        buffer = self.buffers.get(name)
+        values = sorted(buffer.recent()) if buffer else []
+        if not values:
+            return {p: 0.0 for p in percentiles}
+        last = len(values) - 1
+        return {p: values[min(last, round(p / 100 * last))] for p in percentiles}
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Get a summary of every section, with times in milliseconds, slowest (by p95) first"""
+        stats = {}
+        for name, buffer in self.buffers.items():
+            values = buffer.recent()
+            if not values:
+                continue
+            p = self.percentiles(name)
+            stats[name] = {
+                "count": buffer.count,
+                "mean": sum(values) / len(values) * 1000,
+                "p50": p[50] * 1000,
+                "p95": p[95] * 1000,
+                "p99": p[99] * 1000,
+                "max": max(values) * 1000,
+            }
+        return dict(sorted(stats.items(), key=lambda item: item[1]["p95"], reverse=True))
+
+    def reset(self):
+        self.buffers.clear()
+        self.start_times.clear()
+
+
+# The upper bounds of the histogram buckets in milliseconds. The last bucket holds everything slower than this.
+HISTOGRAM_BOUNDS = (0.25, 0.5, 1, 2, 4, 8, 16, 33, 66, 133, 266, 533, 1000)
+
+
+class LatencyHistogram():
+    """Counts timings into fixed buckets, so that it uses the same memory however many calls are recorded."""
+
+    __slots__ = ["bounds", "counts", "total", "max"]
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS):
+        self.bounds = bounds
+        self.counts = array("L", [0]) * (len(bounds) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float):
+        self.counts[bisect_left(self.bounds, ms)] += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def percentile(self, percentile: float) -> float:
+        """Get the upper bound of the bucket that contains this percentile, or the max if it is in the last bucket"""
+        count = self.count
+        if not count:
+            return 0.0
+        target = percentile / 100 * count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target and bucket_count:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def buckets(self) -> dict[str, int]:
+        labels = [f"<={b}" for b in self.bounds] + [f">{self.bounds[-1]}"]
+        return dict(zip(labels, self.counts))
+
+
+class OperatorStats():
+    """The timings of one method (invoke, execute or modal) of one operator"""
+
+    __slots__ = ["statuses", "histogram", "over_budget"]
+
+    def __init__(self):
+        self.statuses: dict[str, int] = {}
+        self.histogram = LatencyHistogram()
+        self.over_budget = 0
+
+
+class OperatorProfiler():
+    """Records how long operator calls take, and what they return.
+    Operators defined with the shared.helpers.Op decorator report to the `operator_profiler` instance while it is
+    enabled. Calls that take longer than the budget (by default one frame at 60fps) are counted separately."""
+
+    __slots__ = ["enabled", "budget", "operators"]
+
+    def __init__(self, enabled=False, budget=16):
+        self.enabled = enabled
+        self.budget = budget
+        # Keyed by "idname.method"
+        self.operators: dict[str, OperatorStats] = {}
+
+    def record(self, name: str, status: str, duration: float):
+        """Add a call that returned `status` and took `duration` seconds"""
+        stats = self.operators.get(name)
+        if stats is None:
+            stats = self.operators[name] = OperatorStats()
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        ms = duration * 1000
+        stats.histogram.add(ms)
+        if ms > self.budget:
+            stats.over_budget += 1
+
+    def stats(self) -> dict[str, dict]:
+        """Get a summary of every operator method, with times in milliseconds, slowest (by p95) first"""
+        stats = {}
+        for name, op_stats in self.operators.items():
+            histogram = op_stats.histogram
+            count = histogram.count
+            p95 = histogram.percentile(95)
+            stats[name] = {
+                "calls": count,
+                "statuses": dict(op_stats.statuses),
+                "mean": histogram.total / count if count else 0.0,
+                "p50": histogram.percentile(50),
+                "p95": p95,
+                "p99": histogram.percentile(99),
+                "max": histogram.max,
+                "over_budget": op_stats.over_budget,
+                "exceeds_budget": p95 > self.budget,
+                "histogram": histogram.buckets(),
+            }
+        return dict(sorted(stats.items(), key=lambda item: item[1]["p95"], reverse=True))
+
+    def over_budget(self) -> dict[str, dict]:
+        """Only the operator methods whose 95th percentile is slower than the budget"""
+        return {name: stats for name, stats in self.stats().items() if stats["exceeds_budget"]}
+
+    def reset(self):
+        self.operators.clear()
+
+
+operator_profiler = OperatorProfiler()
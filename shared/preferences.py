@@ -1,8 +1,8 @@
 import bpy
 import importlib
 import inspect
-from pathlib import Path
 from bpy.props import EnumProperty
+from . import auto_load
 from .icons import icon_collections
 
 PACKAGE = __package__.split(".")[0]
@@ -10,13 +10,9 @@ PACKAGE = __package__.split(".")[0]
 # import individual preferences classes from sub addons
 # so that they can be inherited from by the main prefs.
 all_prefs = []
-addon_dir = Path(__file__).parents[1]
-pref_files = addon_dir.glob("*/*_prefs.py")  # preferences files need to end with "_prefs.py"
-
-for file in pref_files:
-    # convert file path to import path. There's probably a better way to do this.
-    import_path = file.as_posix().split(PACKAGE)[-1].replace("/", ".").replace(".py", "")
-    mod = importlib.import_module(import_path, PACKAGE)
+# preferences files need to be in a sub addon folder, and end with "_prefs.py"
+for module_name in auto_load.get_prefs_module_names():
+    mod = importlib.import_module("." + module_name, PACKAGE)
     classes = inspect.getmembers(mod, inspect.isclass)  # Get all classes from the imported module.
     for name, cls in classes:
         if "prefs" in name.lower():  # preferences class names must have "prefs" in them
@@ -0,0 +1,102 @@
+"""A shared registry for the shaders used by the draw callbacks.
+Shaders are only compiled the first time that they are drawn with, rather than when the addon is enabled,
+so the modules that use them can be imported in background mode, and enabling the addon is faster.
+When there's no gpu to compile them with, get() returns None, and the drawing code should skip drawing."""
+import bpy
+import gpu
+
+from pathlib import Path
+from hashlib import sha1
+from typing import Optional
+
+ROOT = Path(__file__).parents[1]
+
+
+def read_glsl(path: Path) -> str:
+    """Read a glsl file without the #version line, as Blender adds its own"""
+    path = Path(path)
+    if not path.is_absolute():
+        path = ROOT / path
+    with open(path, "r") as f:
+        return "".join(line for line in f if "#version" not in line)
+
+
+class ShaderRegistry():
+    """Compiles shaders on demand, and caches them by name and by source.
+    Registering a shader only stores where it comes from, and the glsl is only read and preprocessed once."""
+
+    __slots__ = ["sources", "shaders", "compiled", "texts"]
+
+    def __init__(self):
+        # name: ("builtin", builtin name) or ("files", (vert path, frag path, geom path))
+        self.sources: dict[str, tuple] = {}
+        # name: compiled shader, or None if it couldn't be compiled
+        self.shaders: dict[str, Optional[gpu.types.GPUShader]] = {}
+        # source hash: compiled shader, so that shaders with the same source are only compiled once
+        self.compiled: dict[str, gpu.types.GPUShader] = {}
+        # path: preprocessed glsl
+        self.texts: dict[Path, str] = {}
+
+    def add_builtin(self, name: str, builtin_name: str = ""):
+        """Register one of Blender's builtin shaders, e.g. '2D_UNIFORM_COLOR'"""
+        self.sources[name] = ("builtin", builtin_name or name)
+        self.shaders.pop(name, None)
+
+    def add_files(self, name: str, vert_path: Path, frag_path: Path, geom_path: Path = ""):
+        """Register a shader made from glsl files. Relative paths are relative to the root of the addon."""
+        paths = tuple(Path(p) for p in (vert_path, frag_path, geom_path) if p)
+        self.sources[name] = ("files", paths)
+        self.shaders.pop(name, None)
+
+    def get(self, name: str) -> Optional[gpu.types.GPUShader]:
+        """Get a shader, compiling it if this is the first time it has been used.
+        Returns None if there's no gpu, or if it failed to compile."""
+        try:
+            return self.shaders[name]
+        except KeyError:
+            pass
+
+        # There's no gpu in background mode, but don't remember that, in case a window is opened later
+        if bpy.app.background:
+            return None
+
+        kind, source = self.sources[name]
+        if kind == "builtin":
+            texts = (source, )
+        else:
+            texts = tuple(self.text(path) for path in source)
+        key = sha1("\0".join((kind, ) + texts).encode()).hexdigest()
+
+        shader = self.compiled.get(key)
+        if shader is None:
+            try:
+                if kind == "builtin":
+                    shader = gpu.shader.from_builtin(source)
+                elif len(texts) == 3:
+                    shader = gpu.types.GPUShader(texts[0], texts[1], geocode=texts[2])
+                else:
+                    shader = gpu.types.GPUShader(texts[0], texts[1])
+            except Exception as error:
+                # Only report it once, rather than on every redraw
+                print(f"Poly frames: Couldn't compile the '{name}' shader, so it won't be drawn: {error}")
+            else:
+                self.compiled[key] = shader
+        self.shaders[name] = shader
+        return shader
+
+    def text(self, path: Path) -> str:
+        """Get the preprocessed glsl from a file"""
+        if path not in self.texts:
+            self.texts[path] = read_glsl(path)
+        return self.texts[path]
+
+    def clear(self):
+        """Forget all of the compiled shaders and glsl, so that they are recompiled the next time they are used"""
+        self.shaders.clear()
+        self.compiled.clear()
+        self.texts.clear()
+
+
+shaders = ShaderRegistry()
+shaders.add_builtin("2D_UNIFORM_COLOR")
+shaders.add_builtin("2D_FLAT_COLOR")
@@ -0,0 +1,145 @@
+"""Record what the addon is doing over time, and save it in the Chrome trace event format.
+The files can be opened in chrome://tracing, https://ui.perfetto.dev or https://www.speedscope.app.
+Spans are only recorded on the main thread, which is where all of the drawing and operators run."""
+import os
+import json
+import threading
+from pathlib import Path
+from functools import wraps
+from collections import deque
+from time import perf_counter
+from typing import Callable, Optional
+
+
+class Tracer():
+    """Records nested, named spans of time, optionally tagged with things like the frame id or node tree name.
+    Finished spans are kept in a fixed size deque, so when it is full the oldest ones are dropped,
+    and the memory used stays bounded however long it is left running."""
+
+    __slots__ = ["enabled", "events", "stack", "max_depth", "dropped"]
+
+    def __init__(self, max_events=200000, max_depth=64):
+        self.enabled = False
+        # (name, start, duration, tags)
+        self.events: deque[tuple[str, float, float, Optional[dict]]] = deque(maxlen=max_events)
+        # The spans that have been started but not finished yet
+        self.stack: list[tuple[str, float, Optional[dict]]] = []
+        self.max_depth = max_depth
+        self.dropped = 0
+
+    def begin(self, name: str, tags: Optional[dict] = None):
+        """Start a span, which will be nested inside any span that is still open"""
+        if not self.enabled:
+            return
+        if len(self.stack) >= self.max_depth:
+            self.dropped += 1
+            return
+        self.stack.append((name, perf_counter(), tags))
+
+    def end(self, name: str):
+        """Finish the most recent span with this name.
+        Any spans opened after it that were never finished (e.g. because of an early return) are closed as well."""
+        if not self.enabled:
+            return
+        stack = self.stack
+        if not any(span[0] == name for span in stack):
+            return
+        now = perf_counter()
+        events = self.events
+        while stack:
+            span_name, start, tags = stack.pop()
+            if len(events) == events.maxlen:
+                self.dropped += 1
+            events.append((span_name, start, now - start, tags))
+            if span_name == name:
+                break
+
+    def span(self, name: str, **tags):
+        """Use as a context manager to record a span around a block of code"""
+        return Span(self, name, tags or None)
+
+    def start(self):
+        self.clear()
+        self.enabled = True
+
+    def stop(self):
+        # Close anything still open so that it isn't lost
+        if self.stack:
+            self.end(self.stack[0][0])
+        self.enabled = False
+
+    def clear(self):
+        self.events.clear()
+        self.stack.clear()
+        self.dropped = 0
+
+    def to_dict(self) -> dict:
+        """Get the recorded spans in the Chrome trace event format, as complete ("X") events in microseconds"""
+        pid = os.getpid()
+        tid = threading.main_thread().ident
+        events = sorted(self.events, key=lambda e: (e[1], -e[2]))
+        origin = events[0][1] if events else 0
+        trace_events = [{
+            "name": name,
+            "cat": "poly_frames",
+            "ph": "X",
+            "ts": (start - origin) * 1e6,
+            "dur": duration * 1e6,
+            "pid": pid,
+            "tid": tid,
+            "args": tags or {},
+        } for name, start, duration, tags in events]
+        return {
+            "traceEvents": trace_events,
+            "displayTimeUnit": "ms",
+            "otherData": {"dropped_spans": self.dropped},
+        }
+
+    def write(self, path) -> int:
+        """Save the trace as json, and return the number of spans written"""
+        data = self.to_dict()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(data, file)
+        return len(data["traceEvents"])
+
+
+class Span():
+    __slots__ = ["tracer", "name", "tags"]
+
+    def __init__(self, tracer: Tracer, name: str, tags: Optional[dict]):
+        self.tracer = tracer
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self):
+        self.tracer.begin(self.name, self.tags)
+        return self
+
+    def __exit__(self, *args):
+        self.tracer.end(self.name)
+
+
+tracer = Tracer()
+
+
+def traced(name="", tags: Callable = None):
+    """A decorator that records a span every time the function is called, while tracing is enabled.
+    `tags` is an optional function that is passed the same arguments, and returns a dict of tags for the span."""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            tracer.begin(span_name, tags(*args, **kwargs) if tags else None)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tracer.end(span_name)
+
+        return wrapper
+
+    return decorator
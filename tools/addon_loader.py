@@ -0,0 +1,27 @@
+"""Load the addon in this checkout from scripts that Blender runs, e.g. the tools and benchmarks.
+This doesn't import bpy at the top level, so the scripts that also run outside of Blender can import it."""
+import sys
+import importlib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def load_addon():
+    """Enable the addon in this checkout if it isn't already, and return its top level module"""
+    import addon_utils
+
+    for module in list(sys.modules.values()):
+        file = getattr(module, "__file__", None)
+        if file and Path(file).resolve() == ROOT / "__init__.py":
+            return module
+
+    sys.path.insert(0, str(ROOT.parent))
+    # Enabling it through addon_utils rather than just registering it means that the preferences exist.
+    addon_utils.enable(ROOT.name, default_set=True)
+    return sys.modules[ROOT.name]
+
+
+def addon_module(name: str):
+    """Import a submodule of the addon, e.g. addon_module("poly_frames.pf_shapes")"""
+    return importlib.import_module(load_addon().__name__ + "." + name)
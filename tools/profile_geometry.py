@@ -0,0 +1,47 @@
+"""Profile the frame geometry code in plain CPython, using the bpy/mathutils stand-ins in tools/standin.
+
+    python tools/profile_geometry.py [--nodes 5000] [--reroutes 0.3] [--sort cumulative] [--limit 30]
+
+This is also a starting point for running py-spy (py-spy record -- python tools/profile_geometry.py)
+or for pytest-benchmark, since the stand-in modules can be loaded the same way from a conftest."""
+import sys
+import argparse
+import cProfile
+import pstats
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import standin  # noqa: E402
+
+
+def run(pf_shapes, node_count: int, reroute_ratio: float):
+    tree = standin.make_fake_tree("profile", node_count, reroute_ratio=reroute_ratio)
+    nodes = list(tree.nodes)
+    frame = standin.fake_frame()
+    groups = [set(nodes[i:i + 50]) for i in range(0, len(nodes), 50)]
+    for mode in ("POINTS", "MINKOWSKI"):
+        for group in groups:
+            shape, center = pf_shapes.build_frame_shape(frame, group, mode=mode, tolerance=2)
+            # The hit tests that the operators run on every mouse move
+            shape.is_inside(center)
+            shape.distance_to_edges(point=center)
+            shape.area()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=5000)
+    parser.add_argument("--reroutes", type=float, default=0.3)
+    parser.add_argument("--sort", default="cumulative")
+    parser.add_argument("--limit", type=int, default=30)
+    args = parser.parse_args()
+
+    # Import before profiling, so that the import time isn't included
+    pf_shapes = standin.load("poly_frames.pf_shapes")
+    profile = cProfile.Profile()
+    profile.runcall(run, pf_shapes, args.nodes, args.reroutes)
+    pstats.Stats(profile).sort_stats(args.sort).print_stats(args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Recompute the stored shapes, centers and label placement of the poly frames in .blend files,
+so that they don't all need rebuilding the first time that the files are drawn.
+
+Rebake the currently open file (run by Blender):
+
+    blender --background file.blend --python tools/rebake_shapes.py -- [--no-save]
+
+Rebake many files in parallel (run by any Python 3 interpreter):
+
+    python tools/rebake_shapes.py --blender /path/to/blender --jobs 8 --output summary.json files_or_folders...
+
+Every file is opened in its own background Blender process, and a json summary with the timings of each file
+is written to the output path (or printed if there isn't one).
+This folder has no __init__.py, so auto_load doesn't try to import it as part of the addon."""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "tools"))
+from addon_loader import addon_module  # noqa: E402
+# Used to pick the result out of the rest of Blender's output
+RESULT_PREFIX = "POLY_FRAMES_REBAKE:"
+
+
+# Run inside Blender
+#################################################
+
+
+def rebake_current_file(save=True) -> dict:
+    pf_rebake = addon_module("poly_frames.pf_rebake")
+
+    start = perf_counter()
+    trees = pf_rebake.rebake_all()
+    rebake_time = perf_counter() - start
+
+    save_time = 0.0
+    if save and trees:
+        start = perf_counter()
+        bpy.ops.wm.save_mainfile()
+        save_time = perf_counter() - start
+
+    return {
+        "file": bpy.data.filepath,
+        "trees": trees,
+        "frames": sum(t["frames"] for t in trees.values()),
+        "rebake_time": rebake_time,
+        "save_time": save_time,
+        "saved": save and bool(trees),
+    }
+
+
+def blender_main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="rebake_shapes.py")
+    parser.add_argument("--no-save", action="store_true", help="Rebake without saving the file")
+    args = parser.parse_args(argv)
+
+    result = rebake_current_file(save=not args.no_save)
+    print(RESULT_PREFIX + json.dumps(result))
+
+
+# Run outside of Blender
+#################################################
+
+
+def collect_files(paths: list[str]) -> list[Path]:
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(path.rglob("*.blend")))
+        else:
+            files.append(path)
+    return files
+
+
+def rebake_file(blender: str, file: Path, save=True) -> dict:
+    """Rebake a single file in a new background Blender process"""
+    command = [blender, "--background", "--factory-startup", str(file), "--python", __file__, "--"]
+    if not save:
+        command.append("--no-save")
+
+    start = perf_counter()
+    process = subprocess.run(command, capture_output=True, text=True)
+    wall_time = perf_counter() - start
+
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            result = json.loads(line[len(RESULT_PREFIX):])
+            result.update(file=str(file), ok=True, wall_time=wall_time)
+            return result
+
+    return {
+        "file": str(file),
+        "ok": False,
+        "wall_time": wall_time,
+        "returncode": process.returncode,
+        "error": process.stderr[-2000:] or process.stdout[-2000:],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebake the poly frame shapes stored in .blend files")
+    parser.add_argument("paths", nargs="+", help=".blend files, or folders to search for them")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="The blender executable")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="How many files to process at once")
+    parser.add_argument("--output", default="", help="Where to write the json summary")
+    parser.add_argument("--no-save", action="store_true", help="Rebake without saving the files")
+    args = parser.parse_args()
+
+    files = collect_files(args.paths)
+    start = perf_counter()
+    results = []
+    # The work happens in the Blender processes, so threads are enough to keep the pool of them busy.
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [executor.submit(rebake_file, args.blender, file, not args.no_save) for file in files]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = "ok" if result["ok"] else "FAILED"
+            print(f"{status}: {result['file']} ({result['wall_time']:.2f}s)", file=sys.stderr)
+
+    summary = {
+        "jobs": args.jobs,
+        "total_time": perf_counter() - start,
+        "succeeded": sum(r["ok"] for r in results),
+        "failed": sum(not r["ok"] for r in results),
+        "files": sorted(results, key=lambda r: r["file"]),
+    }
+    text = json.dumps(summary, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    else:
+        print(text)
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    if bpy is not None:
+        blender_main()
+    else:
+        main()
@@ -0,0 +1,62 @@
+"""Replay an interaction recording from the "Record interactions" button in the performance panel,
+and time how long each event takes to handle and redraw.
+
+    blender --background --factory-startup --python tools/replay_interactions.py -- \
+        trace.json [--output report.json] [--repeat 3] [--events]
+
+The report has the per operator timings (in ms) of the fastest run, and the number of events that failed to replay.
+Add --events to include the timings of every event as well.
+Node dimensions are all 0 in background mode, so the frame shapes will be smaller than they were when recording,
+but the same work is done to build them.
+This folder has no __init__.py, so auto_load doesn't try to import it as part of the addon."""
+import sys
+import json
+import argparse
+from pathlib import Path
+
+import bpy
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "tools"))
+from addon_loader import addon_module  # noqa: E402
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="replay_interactions.py")
+    parser.add_argument("trace", help="The recording to replay")
+    parser.add_argument("--output", default="", help="Where to write the json report")
+    parser.add_argument("--repeat", type=int, default=1, help="How many times to replay it. The fastest run is kept")
+    parser.add_argument("--events", action="store_true", help="Include the timings of every event in the report")
+    args = parser.parse_args(argv)
+
+    pf_recorder = addon_module("poly_frames.pf_recorder")
+    pf_operators = addon_module("poly_frames.pf_operators")
+
+    trace = pf_recorder.read_trace(args.trace)
+    operator_classes = pf_recorder.get_operator_classes(pf_operators)
+    runs = [pf_recorder.replay(trace, operator_classes) for _ in range(max(1, args.repeat))]
+    best = min(runs, key=lambda run: sum(e.get("handle_ms", 0) + e.get("redraw_ms", 0) for e in run["events"]))
+
+    report = {
+        "trace": args.trace,
+        "blender": bpy.app.version_string,
+        "events": len(trace["events"]),
+        "errors": best["errors"],
+        "repeat": len(runs),
+        "summary": best["summary"],
+    }
+    if args.events:
+        report["event_timings"] = best["events"]
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    else:
+        print(text)
+    for event in best["events"]:
+        if "error" in event:
+            print(f"Event {event['index']} ({event['operator']}.{event['method']}): {event['error']}", file=sys.stderr)
+
+
+main()
@@ -0,0 +1,48 @@
+"""Load the addon's modules in plain CPython, without Blender.
+
+The geometry code (shared.helpers, poly_frames.pf_shapes, pf_functions, pf_labels, pf_workers and the shape
+pipeline in draw_handlers) only needs bpy, gpu, blf and mathutils to be importable, so this installs pure python
+stand-ins for them, and then imports the addon through a synthetic root package. That skips the addon's own
+__init__.py, which would try to register everything with auto_load.
+
+    import sys
+    sys.path.insert(0, "tools")
+    import standin
+
+    pf_shapes = standin.load("poly_frames.pf_shapes")
+    tree = standin.make_fake_tree("test", 1000)
+    shape, center = pf_shapes.build_frame_shape(standin.fake_frame(), set(tree.nodes))
+
+That works with cProfile, py-spy, pytest-benchmark etc. If the real bpy or mathutils are available
+(e.g. when run inside Blender, or with the bpy module from pypi), those are used instead of the stand-ins.
+This folder isn't in a package, so auto_load never imports it as part of the addon.
+"""
+import sys
+import importlib
+from pathlib import Path
+from types import ModuleType
+from .blender import install_modules
+from .mathutils import Vector
+from .nodes import FakeNode, FakeNodes, FakeNodeTree, make_fake_tree, fake_frame
+
+ROOT = Path(__file__).resolve().parents[2]
+PACKAGE_NAME = "poly_frames_standin"
+
+__all__ = ["install", "load", "Vector", "FakeNode", "FakeNodes", "FakeNodeTree", "make_fake_tree", "fake_frame"]
+
+
+def install(package_name=PACKAGE_NAME) -> ModuleType:
+    """Install the stand-in modules, and create a root package for the addon that doesn't run its __init__.py"""
+    install_modules()
+    if package_name not in sys.modules:
+        root = ModuleType(package_name)
+        root.__path__ = [str(ROOT)]
+        root.__package__ = package_name
+        sys.modules[package_name] = root
+    return sys.modules[package_name]
+
+
+def load(module_name: str, package_name=PACKAGE_NAME) -> ModuleType:
+    """Import a module of the addon by its path from the root, e.g. load("shared.helpers")"""
+    install(package_name)
+    return importlib.import_module(f"{package_name}.{module_name}")
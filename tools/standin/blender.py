@@ -0,0 +1,222 @@
+"""Fake versions of the bpy, gpu and blf modules, with just enough in them for the addon's modules to be imported.
+Nothing is drawn or registered. bpy.app.background is True, so the shader registry never compiles anything."""
+import sys
+import tempfile
+from types import ModuleType, SimpleNamespace
+from . import mathutils as fake_mathutils
+
+
+class PlaceholderModule(ModuleType):
+    """A module where any attribute that doesn't exist is a new empty class, e.g. bpy.types.Operator"""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = type(name, (), {"__module__": self.__name__})
+        setattr(self, name, value)
+        return value
+
+
+def module(name: str, placeholder=False, **attrs) -> ModuleType:
+    mod = PlaceholderModule(name) if placeholder else ModuleType(name)
+    mod.__dict__.update(attrs)
+    return mod
+
+
+# bpy
+#################################################
+
+
+class _PropertyDeferred():
+    """What bpy.props functions return, before the class they are on is registered"""
+
+    def __init__(self, function, keywords):
+        self.function = function
+        self.keywords = keywords
+
+    def __repr__(self):
+        return f"<_PropertyDeferred, {self.function.__name__}, {self.keywords}>"
+
+
+def _property(name):
+
+    def prop(**keywords):
+        return _PropertyDeferred(prop, keywords)
+
+    prop.__name__ = name
+    return prop
+
+
+class Timers():
+    """Records registered timers, but never runs them. Call run_all() to run each one once."""
+
+    def __init__(self):
+        self.functions = {}
+
+    def register(self, function, first_interval=0, persistent=False):
+        self.functions[function] = first_interval
+
+    def unregister(self, function):
+        del self.functions[function]
+
+    def is_registered(self, function):
+        return function in self.functions
+
+    def run_all(self):
+        for function in list(self.functions):
+            interval = function()
+            if interval is None:
+                self.functions.pop(function, None)
+            else:
+                self.functions[function] = interval
+
+
+class Operators():
+    """bpy.ops, where every operator does nothing"""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return OperatorCategory()
+
+
+class OperatorCategory():
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: {"CANCELLED"}
+
+
+def make_bpy() -> dict[str, ModuleType]:
+    handler_names = ["load_pre", "load_post", "undo_pre", "undo_post", "redo_pre", "redo_post",
+                     "depsgraph_update_pre", "depsgraph_update_post", "save_pre", "save_post"]
+    handlers = module("bpy.app.handlers", persistent=lambda func: func, **{name: [] for name in handler_names})
+    timers = Timers()
+    app = module(
+        "bpy.app",
+        version=(3, 0, 0),
+        version_string="3.0.0 (stand-in)",
+        background=True,
+        tempdir=tempfile.gettempdir(),
+        handlers=handlers,
+        timers=timers,
+    )
+
+    prop_names = ["BoolProperty", "BoolVectorProperty", "IntProperty", "IntVectorProperty", "FloatProperty",
+                  "FloatVectorProperty", "StringProperty", "EnumProperty", "PointerProperty", "CollectionProperty"]
+    props = module("bpy.props", _PropertyDeferred=_PropertyDeferred, **{name: _property(name) for name in prop_names})
+
+    types = module("bpy.types", placeholder=True)
+    utils = module(
+        "bpy.utils",
+        register_class=lambda cls: None,
+        unregister_class=lambda cls: None,
+        previews=module("bpy.utils.previews", new=lambda: {}, remove=lambda previews: None),
+    )
+    path = module("bpy.path", abspath=lambda path, **kwargs: path)
+    context = SimpleNamespace(
+        preferences=SimpleNamespace(system=SimpleNamespace(dpi=72, pixel_size=1), addons={}),
+        window_manager=SimpleNamespace(windows=[]),
+        area=None,
+        space_data=None,
+    )
+    data = SimpleNamespace(node_groups=[], materials=[], scenes=[], worlds=[], lights=[], textures=[], linestyles=[])
+    bpy = module(
+        "bpy",
+        app=app,
+        props=props,
+        types=types,
+        utils=utils,
+        path=path,
+        context=context,
+        data=data,
+        ops=Operators(),
+        msgbus=module("bpy.msgbus", subscribe_rna=lambda **kwargs: None, clear_by_owner=lambda owner: None),
+    )
+    return {
+        "bpy": bpy,
+        "bpy.app": app,
+        "bpy.app.handlers": handlers,
+        "bpy.props": props,
+        "bpy.types": types,
+        "bpy.utils": utils,
+        "bpy.utils.previews": utils.previews,
+        "bpy.path": path,
+        "bpy.msgbus": bpy.msgbus,
+    }
+
+
+# gpu and blf
+#################################################
+
+
+def noop(*args, **kwargs):
+    return None
+
+
+def make_gpu() -> dict[str, ModuleType]:
+    gpu_types = module("gpu.types", placeholder=True)
+    shader = module("gpu.shader", from_builtin=noop)
+    state = module("gpu.state", blend_set=noop, line_width_set=noop, point_size_set=noop)
+    gpu = module("gpu", types=gpu_types, shader=shader, state=state)
+    batch = module("gpu_extras.batch", batch_for_shader=noop)
+    gpu_extras = module("gpu_extras", batch=batch)
+    return {
+        "gpu": gpu,
+        "gpu.types": gpu_types,
+        "gpu.shader": shader,
+        "gpu.state": state,
+        "gpu_extras": gpu_extras,
+        "gpu_extras.batch": batch,
+    }
+
+
+class FontState():
+    size = 11
+
+
+def make_blf() -> dict[str, ModuleType]:
+    state = FontState()
+
+    def size(font_id, size, dpi=72):
+        state.size = size * dpi / 72
+
+    def dimensions(font_id, text):
+        # A rough approximation of the default font
+        return len(text) * state.size * .55, state.size * .75
+
+    blf = module(
+        "blf",
+        ROTATION=1,
+        CLIPPING=2,
+        SHADOW=4,
+        size=size,
+        dimensions=dimensions,
+        position=noop,
+        draw=noop,
+        color=noop,
+        enable=noop,
+        disable=noop,
+        rotation=noop,
+    )
+    return {"blf": blf}
+
+
+def make_mathutils() -> dict[str, ModuleType]:
+    geometry_names = ["convex_hull_2d", "intersect_point_tri_2d", "intersect_line_line_2d", "interpolate_bezier",
+                      "area_tri"]
+    geometry = module("mathutils.geometry", **{name: getattr(fake_mathutils, name) for name in geometry_names})
+    mathutils = module("mathutils", Vector=fake_mathutils.Vector, geometry=geometry)
+    return {"mathutils": mathutils, "mathutils.geometry": geometry}
+
+
+def fake_modules() -> dict[str, ModuleType]:
+    modules = {}
+    for make in (make_bpy, make_gpu, make_blf, make_mathutils):
+        modules.update(make())
+    return modules
+
+
+def install_modules():
+    """Add the fake modules to sys.modules, without replacing any real ones"""
+    for name, mod in fake_modules().items():
+        sys.modules.setdefault(name, mod)
@@ -0,0 +1,246 @@
+"""Pure python versions of the parts of mathutils that the addon uses.
+These are much slower than the real thing, so absolute timings of code that leans on them will be pessimistic,
+but they behave the same, so profiles still show where the time goes."""
+from numbers import Number
+from math import sqrt, acos, atan2
+
+
+class Vector():
+    """A 2, 3 or 4 dimensional vector that behaves like mathutils.Vector"""
+
+    __slots__ = ["_values"]
+    # mathutils vectors can't be hashed unless they are frozen
+    __hash__ = None
+
+    def __init__(self, seq=(0.0, 0.0, 0.0)):
+        self._values = [float(v) for v in seq]
+
+    # Access
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self._values[index])
+        return self._values[index]
+
+    def __setitem__(self, index, value):
+        self._values[index] = float(value)
+
+    def _axis(i):
+        return property(lambda self: self._values[i], lambda self, value: self.__setitem__(i, value))
+
+    x = _axis(0)
+    y = _axis(1)
+    z = _axis(2)
+    w = _axis(3)
+    del _axis
+
+    @property
+    def xy(self):
+        return Vector(self._values[:2])
+
+    # Arithmetic
+
+    def _other(self, other):
+        other = list(other)
+        if len(other) != len(self._values):
+            raise ValueError(f"Vectors must have the same size ({len(self._values)} and {len(other)})")
+        return other
+
+    def __add__(self, other):
+        return Vector([a + b for a, b in zip(self._values, self._other(other))])
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return Vector([a - b for a, b in zip(self._values, self._other(other))])
+
+    def __rsub__(self, other):
+        return Vector([b - a for a, b in zip(self._values, self._other(other))])
+
+    def __mul__(self, other):
+        if isinstance(other, Number):
+            return Vector([a * other for a in self._values])
+        # Since blender 2.8, multiplying two vectors is element wise
+        return Vector([a * b for a, b in zip(self._values, self._other(other))])
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return Vector([a / other for a in self._values])
+
+    def __matmul__(self, other):
+        return self.dot(other)
+
+    def __neg__(self):
+        return Vector([-a for a in self._values])
+
+    def __iadd__(self, other):
+        self._values = [a + b for a, b in zip(self._values, self._other(other))]
+        return self
+
+    def __isub__(self, other):
+        self._values = [a - b for a, b in zip(self._values, self._other(other))]
+        return self
+
+    def __imul__(self, other):
+        self._values = (self * other)._values
+        return self
+
+    def __eq__(self, other):
+        try:
+            return len(other) == len(self._values) and all(a == b for a, b in zip(self._values, other))
+        except TypeError:
+            return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    # Methods
+
+    @property
+    def length(self) -> float:
+        return sqrt(sum(a * a for a in self._values))
+
+    @property
+    def length_squared(self) -> float:
+        return sum(a * a for a in self._values)
+
+    def dot(self, other) -> float:
+        return sum(a * b for a, b in zip(self._values, self._other(other)))
+
+    def cross(self, other):
+        """The same as mathutils: a float for 2D vectors, and a vector for 3D ones"""
+        b = self._other(other)
+        a = self._values
+        if len(a) == 2:
+            return a[0] * b[1] - a[1] * b[0]
+        return Vector((a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0]))
+
+    def normalized(self):
+        length = self.length
+        if not length:
+            return Vector(self._values)
+        return Vector([a / length for a in self._values])
+
+    def normalize(self):
+        self._values = self.normalized()._values
+
+    def angle(self, other, fallback=None) -> float:
+        lengths = self.length * Vector(other).length
+        if not lengths:
+            if fallback is None:
+                raise ValueError("Vector.angle(other): zero length vectors have no valid angle")
+            return fallback
+        return acos(max(-1.0, min(1.0, self.dot(other) / lengths)))
+
+    def angle_signed(self, other, fallback=None) -> float:
+        if not self.length or not Vector(other).length:
+            if fallback is None:
+                raise ValueError("Vector.angle_signed(other): zero length vectors have no valid angle")
+            return fallback
+        return -atan2(self.cross(other), self.dot(other))
+
+    def lerp(self, other, factor):
+        return self + (Vector(other) - self) * factor
+
+    def resized(self, size):
+        return Vector((self._values + [0.0] * size)[:size])
+
+    def to_2d(self):
+        return self.resized(2)
+
+    def to_3d(self):
+        return self.resized(3)
+
+    def to_tuple(self, precision=-1):
+        if precision == -1:
+            return tuple(self._values)
+        return tuple(round(a, precision) for a in self._values)
+
+    def copy(self):
+        return Vector(self._values)
+
+    def freeze(self):
+        return self
+
+    def __repr__(self):
+        return f"Vector(({', '.join(f'{a:.4f}' for a in self._values)}))"
+
+
+# mathutils.geometry
+#################################################
+
+
+def _cross_2d(o, a, b) -> float:
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+
+def convex_hull_2d(points) -> list[int]:
+    """Get the indices of the points on the convex hull, in counter clockwise order"""
+    order = sorted(range(len(points)), key=lambda i: (points[i][0], points[i][1]))
+    if len(order) < 3:
+        return order
+
+    def half_hull(indices):
+        hull = []
+        for i in indices:
+            while len(hull) >= 2 and _cross_2d(points[hull[-2]], points[hull[-1]], points[i]) <= 0:
+                hull.pop()
+            hull.append(i)
+        return hull[:-1]
+
+    return half_hull(order) + half_hull(order[::-1])
+
+
+def intersect_point_tri_2d(pt, tri_p1, tri_p2, tri_p3) -> int:
+    """1 if the point is inside a counter clockwise triangle, -1 if it is inside a clockwise one, otherwise 0"""
+    d1 = _cross_2d(tri_p1, tri_p2, pt)
+    d2 = _cross_2d(tri_p2, tri_p3, pt)
+    d3 = _cross_2d(tri_p3, tri_p1, pt)
+    if d1 >= 0 and d2 >= 0 and d3 >= 0:
+        return 1
+    if d1 <= 0 and d2 <= 0 and d3 <= 0:
+        return -1
+    return 0
+
+
+def intersect_line_line_2d(line_a_p1, line_a_p2, line_b_p1, line_b_p2):
+    """Get the point where two line segments cross, or None if they don't"""
+    r = (line_a_p2[0] - line_a_p1[0], line_a_p2[1] - line_a_p1[1])
+    s = (line_b_p2[0] - line_b_p1[0], line_b_p2[1] - line_b_p1[1])
+    denominator = r[0] * s[1] - r[1] * s[0]
+    if denominator == 0:
+        return None
+    qp = (line_b_p1[0] - line_a_p1[0], line_b_p1[1] - line_a_p1[1])
+    t = (qp[0] * s[1] - qp[1] * s[0]) / denominator
+    u = (qp[0] * r[1] - qp[1] * r[0]) / denominator
+    if 0 <= t <= 1 and 0 <= u <= 1:
+        return Vector((line_a_p1[0] + t * r[0], line_a_p1[1] + t * r[1]))
+    return None
+
+
+def interpolate_bezier(knot1, handle1, handle2, knot2, resolution) -> list[Vector]:
+    """Get `resolution` points along a cubic bezier, including both knots"""
+    knot1, handle1, handle2, knot2 = (Vector(v) for v in (knot1, handle1, handle2, knot2))
+    points = []
+    for i in range(resolution):
+        t = i / (resolution - 1) if resolution > 1 else 0
+        mt = 1 - t
+        points.append(knot1 * (mt**3) + handle1 * (3 * mt * mt * t) + handle2 * (3 * mt * t * t) + knot2 * (t**3))
+    return points
+
+
+def area_tri(v1, v2, v3) -> float:
+    """The (unsigned) area of a 2D or 3D triangle"""
+    if len(v1) == 2:
+        return abs(_cross_2d(v1, v2, v3)) / 2
+    a = Vector(v2) - Vector(v1)
+    b = Vector(v3) - Vector(v1)
+    return a.cross(b).length / 2
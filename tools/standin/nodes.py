@@ -0,0 +1,66 @@
+"""Fake nodes and node trees, with the attributes that the shape and hit test code reads"""
+import random
+from math import ceil, sqrt
+from types import SimpleNamespace
+from .mathutils import Vector
+
+
+class FakeNode():
+
+    def __init__(self, name: str, type="SET_POSITION", location=(0, 0), dimensions=(140, 100), parent=None):
+        self.name = name
+        self.type = type
+        self.location = Vector(location)
+        self.dimensions = Vector(dimensions)
+        self.width = dimensions[0]
+        self.parent = parent
+        self.select = False
+        self.poly_frames = SimpleNamespace(uid=-1)
+
+    def __repr__(self):
+        return f"<FakeNode {self.name!r} {self.type}>"
+
+
+class FakeNodes(list):
+    """A list of nodes that can also create new ones, like bpy_prop_collection"""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.active = None
+
+    def new(self, type: str) -> FakeNode:
+        node_type = "REROUTE" if type == "NodeReroute" else "FRAME" if type == "NodeFrame" else "SET_POSITION"
+        dimensions = (16, 16) if node_type == "REROUTE" else (140, 100)
+        node = FakeNode(f"{type}.{len(self):03}", node_type, dimensions=dimensions)
+        self.append(node)
+        return node
+
+    def get(self, name: str, default=None):
+        return next((n for n in self if n.name == name), default)
+
+
+class FakeNodeTree():
+
+    def __init__(self, name="NodeTree"):
+        self.name = name
+        self.nodes = FakeNodes()
+
+    def as_pointer(self) -> int:
+        return id(self)
+
+
+def make_fake_tree(name: str, node_count: int, reroute_ratio=0.0, seed=0) -> FakeNodeTree:
+    """The same layout as benchmarks/bench_utils.make_synthetic_tree: a grid of nodes, some of which are reroutes"""
+    rng = random.Random(seed)
+    tree = FakeNodeTree(name)
+    columns = ceil(sqrt(node_count))
+    for i in range(node_count):
+        node = tree.nodes.new("NodeReroute" if rng.random() < reroute_ratio else "GeometryNodeSetPosition")
+        node.location = Vector(((i % columns) * 250, -(i // columns) * 200))
+        node.poly_frames.uid = i
+    return tree
+
+
+def fake_frame(subframes=()):
+    """The shape functions only read the subframes of a frame, so this is enough to build shapes from"""
+    return SimpleNamespace(subframes=set(subframes))